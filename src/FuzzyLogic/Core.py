@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 # # @class FuzzyLogicBaseObject
 #  @brief The base object provides the functions repr and str
@@ -28,12 +29,31 @@ class FuzzyLogicBaseObject(object):
     def __str__(self):
         return repr(self)
     
+# # @fn inputArray(x)
+#  Return x as a new float64 array with at least one dimension, that membership functions can update in place
+def inputArray(x):
+    return np.array(x, dtype=np.float64, ndmin=1)
+
+# # @fn membership(output, x)
+#  Return the membership array output with the shape of the input x, or as a float if x is a scalar, so that scalar inputs keep producing scalar outputs
+def membership(output, x):
+    return output.item() if np.ndim(x) == 0 else output.reshape(np.shape(x))
+
 class FuzzySet(FuzzyLogicBaseObject):
     
     # # @fn fuzzify(input)
     #  Return a double value that reflects a membership function
+    #
+    #  Every FuzzySet accepts either a number or a numpy array, and returns the membership of every element of x with the same shape
     def fuzzify(self, x):
-        return 0.0
+        return membership(np.zeros(np.shape(x)), x)
+    
+# # @class UniversalSet
+#  The set that contains every value, used for the inputs that a rule does not depend on
+class UniversalSet(FuzzySet):
+    
+    def fuzzify(self, x):
+        return membership(np.ones(np.shape(x)), x)
     
 class TriangularSet(FuzzySet):
     
@@ -43,15 +63,21 @@ class TriangularSet(FuzzySet):
         self.center = center
         self.upperLimit = upperLimit
     
+    # # @fn fuzzify(x)
+    #  The membership is the lowest of the rising and falling slopes, clipped at 0. A vertical side is a step at its limit
     def fuzzify(self, x):
-        output = 0.0
-        if x >= self.lowerLimit and x <= self.upperLimit :
-            if x < self.center:
-                output = (x - self.lowerLimit) / (self.center - self.lowerLimit)
-            else:
-                output = 1 - ((x - self.center) / (self.upperLimit - self.center))
-            
-        return output
+        output = inputArray(x)
+        if self.upperLimit > self.center:
+            falling = (self.upperLimit - output) * (1.0 / (self.upperLimit - self.center))
+        else:
+            falling = np.where(output <= self.upperLimit, 1.0, 0.0)
+        if self.center > self.lowerLimit:
+            output -= self.lowerLimit
+            output *= 1.0 / (self.center - self.lowerLimit)
+        else:
+            output = np.where(output >= self.lowerLimit, 1.0, 0.0)
+        np.minimum(output, falling, out=output)
+        return membership(np.maximum(output, 0.0, out=output), x)
     
 class GaussianSet(FuzzySet):
     def __init__(self, center=0, sigma=1, **kwargs):
@@ -60,9 +86,12 @@ class GaussianSet(FuzzySet):
         self.sigma = sigma
     
     def fuzzify(self, x):
-        num = -math.pow(x - self.center, 2)
+        output = inputArray(x)
+        output -= self.center
+        output *= output
         den = 2 * math.pow(self.sigma, 2)
-        return math.exp(num / den)
+        output *= -1.0 / den
+        return membership(np.exp(output, out=output), x)
 
 class NDFuzzifier(FuzzySet):
     
@@ -70,8 +99,12 @@ class NDFuzzifier(FuzzySet):
         super(NDFuzzifier, self).__init__(**kwargs)
         self.sets = sets
         
+    # # @fn fuzzify(*x)
+    #  Return the product of the memberships of every input in its set
+    #
+    #  The inputs are broadcast against each other, e.g. the matrices of np.meshgrid, or a column and a row vector, produce the membership over the whole grid
     def fuzzify(self, *x):
-        output = 1.0
+        output = np.float64(1.0)
         for xx, f in zip(x, self.sets):
-            output *= f.fuzzify(xx)
-        return output
\ No newline at end of file
+            output = output * np.asarray(f.fuzzify(xx))
+        return output.item() if np.ndim(output) == 0 else output
@@ -0,0 +1,178 @@
+from Core import FuzzyLogicBaseObject
+
+import itertools
+import numpy as np
+
+# # @fn result(output)
+#  Return a 0-d output as a float, so that scalar queries keep producing scalar outputs
+def result(output):
+    return output.item() if np.ndim(output) == 0 else output
+
+# # @fn gridAxes(axes)
+#  Return the grid axes reshaped to broadcast against each other, axis i varies along dimension i
+def gridAxes(axes):
+    return [axis.reshape([-1 if j == i else 1 for j in xrange(len(axes))]) for i, axis in enumerate(axes)]
+
+# # @fn interpolate(axes, table, x)
+#  Interpolate table, sampled over the grid given by axes, at the inputs x
+#
+#  The last len(axes) dimensions of table are the grid dimensions, the leading dimensions (e.g. one per rule) are kept.
+#  The inputs are broadcast against each other and clipped to the grid limits. The interpolation is multilinear, so every query reads the 2^len(axes) corners of its grid cell.
+def interpolate(axes, table, x):
+    x = np.broadcast_arrays(*[np.asarray(xx, dtype=np.float64) for xx in x])
+    lower, weight = [], []
+    for xx, axis in zip(x, axes):
+        position = (np.clip(xx, axis[0], axis[-1]) - axis[0]) * ((len(axis) - 1) / (axis[-1] - axis[0]))
+        index = np.minimum(position.astype(np.intp), len(axis) - 2)
+        lower.append(index)
+        weight.append(position - index)
+    output = 0.0
+    for corner in itertools.product((0, 1), repeat=len(axes)):
+        cornerWeight = 1.0
+        for c, w in zip(corner, weight):
+            cornerWeight = cornerWeight * (w if c else 1.0 - w)
+        output = output + cornerWeight * table[(Ellipsis,) + tuple(i + c for i, c in zip(lower, corner))]
+    return output
+
+# # @class Rule
+#  A fuzzy rule: if the inputs belong to antecedent then the output is consequent
+#
+#  The antecedent is a FuzzySet over every input, usually an NDFuzzifier with one set per input (Core.UniversalSet for the inputs the rule does not depend on). Its membership is the firing strength of the rule, scaled by weight.
+#  The consequent is a FuzzySet over the output for a MamdaniRuleBase, and a constant or a list of linear coefficients [a0, a1, ..., an], for the output a0 + a1*x1 + ... + an*xn, for a SugenoRuleBase.
+class Rule(FuzzyLogicBaseObject):
+    def __init__(self, antecedent=None, consequent=0.0, weight=1.0, **kwargs):
+        super(Rule, self).__init__(**kwargs)
+        self.antecedent = antecedent
+        self.consequent = consequent
+        self.weight = weight
+
+    # # @fn firingStrength(*x)
+    #  Return the firing strength of the rule for the inputs x, which may be numbers or broadcastable arrays
+    def firingStrength(self, *x):
+        return self.weight * np.asarray(self.antecedent.fuzzify(*x))
+
+# # @class RuleBase
+#  The base class of the rule bases, which evaluates the firing strengths of every rule and leaves the defuzzification to derived classes
+#
+#  The evaluate method accepts numbers or numpy arrays, broadcast against each other, and returns an output for every query.
+#  After compile, the firing strengths and the output are interpolated from lookup tables computed over a grid of the inputs, so the cost of a query no longer depends on the number of rules or on the output resolution. The tables approximate the exact output within the grid resolution, and the inputs are clipped to the grid limits. They must be compiled again (or dropped with decompile) after the rules change.
+class RuleBase(FuzzyLogicBaseObject):
+    def __init__(self, rules=[], default=0.0, **kwargs):
+        super(RuleBase, self).__init__(**kwargs)
+        self.rules = list(rules)
+        # # @property default The output of the queries that fire no rule
+        self.default = default
+        self.decompile()
+
+    # # @fn firingStrengths(*x)
+    #  Return an array with the firing strength of every rule, indexed by rule in the first dimension and by query in the others
+    def firingStrengths(self, *x):
+        if self.firingTable is not None:
+            return interpolate(self.axes, self.firingTable, x)
+        shape = np.broadcast(*[np.asarray(xx) for xx in x]).shape
+        return np.array([np.broadcast_to(rule.firingStrength(*x), shape) for rule in self.rules])
+
+    # # @fn defuzzify(strengths, x)
+    #  Return the crisp output of the queries x from the firing strengths of every rule
+    def defuzzify(self, strengths, x):
+        return np.full(strengths.shape[1:], self.default)
+
+    # # @fn evaluate(*x)
+    #  Return the crisp output of the rule base for the inputs x
+    def evaluate(self, *x):
+        if self.outputTable is not None:
+            return result(interpolate(self.axes, self.outputTable, x))
+        return result(self.defuzzify(self.firingStrengths(*x), x))
+
+    # # @fn compile(ranges, resolution=65)
+    #  Precompute the firing strength and output lookup tables over a grid of the inputs
+    #  @param ranges A list with the (lower, upper) limits of every input
+    #  @param resolution The number of grid points per input, or a list with the number of points of every input
+    #
+    #  Every range must have upper > lower, and every input at least 2 grid points, otherwise a ValueError is raised.
+    def compile(self, ranges, resolution=65):
+        if np.ndim(resolution) == 0:
+            resolution = [resolution] * len(ranges)
+        if len(resolution) != len(ranges):
+            raise ValueError('Expected %d resolutions, one per input range, got %d' % (len(ranges), len(resolution)))
+        for i, ((lower, upper), n) in enumerate(zip(ranges, resolution)):
+            if not upper > lower:
+                raise ValueError('The range of input %d must have upper > lower, got (%r, %r)' % (i, lower, upper))
+            if n < 2:
+                raise ValueError('Input %d needs a resolution of at least 2 grid points, got %r' % (i, n))
+        self.decompile()
+        axes = [np.linspace(lower, upper, n) for (lower, upper), n in zip(ranges, resolution)]
+        x = gridAxes(axes)
+        firingTable = self.firingStrengths(*x)
+        self.outputTable = self.defuzzify(firingTable, x)
+        self.firingTable = firingTable
+        self.axes = axes
+
+    # # @fn decompile()
+    #  Drop the lookup tables, evaluate computes the exact output again
+    def decompile(self):
+        self.axes = None
+        self.firingTable = None
+        self.outputTable = None
+
+# # @class MamdaniRuleBase
+#  A Mamdani rule base: every consequent set is clipped at (or, with implication='product', scaled by) the firing strength of its rule, the clipped sets are aggregated with max and the output is the centroid of the aggregate
+#
+#  The centroid is computed over resolution points of outputRange. The memberships of the consequents over these points are computed once.
+class MamdaniRuleBase(RuleBase):
+    def __init__(self, rules=[], outputRange=(0.0, 1.0), resolution=101, implication='min', **kwargs):
+        self.outputRange = outputRange
+        self.resolution = resolution
+        self.implication = implication
+        super(MamdaniRuleBase, self).__init__(rules=rules, **kwargs)
+
+    # # @fn decompile()
+    #  Drop the lookup tables, including the consequent memberships
+    def decompile(self):
+        super(MamdaniRuleBase, self).decompile()
+        self.consequentTable = None
+
+    # # @fn consequentMemberships()
+    #  Return the output points and the (nRules x resolution) matrix with the membership of every consequent at these points
+    def consequentMemberships(self):
+        y = np.linspace(self.outputRange[0], self.outputRange[1], self.resolution)
+        if self.consequentTable is None:
+            self.consequentTable = np.array([np.broadcast_to(rule.consequent.fuzzify(y), y.shape) for rule in self.rules]).reshape(len(self.rules), len(y))
+        return y, self.consequentTable
+
+    def defuzzify(self, strengths, x):
+        y, memberships = self.consequentMemberships()
+        aggregate = np.zeros(strengths.shape[1:] + y.shape)
+        for strength, membership in zip(strengths, memberships):
+            if self.implication == 'product':
+                implied = strength[..., np.newaxis] * membership
+            else:
+                implied = np.minimum(strength[..., np.newaxis], membership)
+            np.maximum(aggregate, implied, out=aggregate)
+        area = aggregate.sum(axis=-1)
+        moment = aggregate.dot(y)
+        fired = area > 0
+        return np.where(fired, moment / np.where(fired, area, 1.0), self.default)
+
+# # @class SugenoRuleBase
+#  A Sugeno (Takagi-Sugeno-Kang) rule base: the output is the average of the rule consequents, weighted by their firing strengths
+class SugenoRuleBase(RuleBase):
+
+    # # @fn consequents(x)
+    #  Return an array with the consequent of every rule for the queries x, indexed by rule in the first dimension
+    def consequents(self, x):
+        shape = np.broadcast(*[np.asarray(xx) for xx in x]).shape
+        output = []
+        for rule in self.rules:
+            coefficients = np.atleast_1d(np.asarray(rule.consequent, dtype=np.float64))
+            z = coefficients[0]
+            for a, xx in zip(coefficients[1:], x):
+                z = z + a * np.asarray(xx)
+            output.append(np.broadcast_to(z, shape))
+        return np.array(output)
+
+    def defuzzify(self, strengths, x):
+        total = strengths.sum(axis=0)
+        weighted = (strengths * self.consequents(x)).sum(axis=0)
+        fired = total > 0
+        return np.where(fired, weighted / np.where(fired, total, 1.0), self.default)
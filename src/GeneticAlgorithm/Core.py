@@ -1,5 +1,20 @@
+import os
+import sys
 import copy
+import json
+import time
 import random
+import cPickle
+import numpy as np
+# Allocation tracking is optional: tracemalloc (or its pytracemalloc backport) is preferred, the growth of the peak resident memory is used otherwise
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+try:
+    import resource
+except ImportError:
+    resource = None
 
 
 ## @class GABaseObject
@@ -50,6 +65,9 @@ class GABaseObject(object):
 #  All of these functions receive a population object, which is expected to be modified by the function in order to implement the desired transformation.
 #  Please note that a single operator could implement a full genetic algorithm, but modularization is encouraged to allow easy re-use of operators 
 class GeneticOperator(GABaseObject):
+    ## @var transientProperties
+    #  @brief The names of the properties that hold resources that can not be saved (e.g. processes, files or plots); they are left out of the operator state, and are expected to be recreated when needed
+    transientProperties = ()
     ## @fn initialize(population)
     #  @param population The population object to operate upon
     #  @brief This function is called once, during the startup phase of the algorithm
@@ -65,6 +83,27 @@ class GeneticOperator(GABaseObject):
     #  @brief This function is called once at the end of the algorithm run
     def finalize(self, population):
         pass
+    ## @fn requestStop(self, population, reason)
+    #  @brief Ask the scheduler to stop the run after the current iteration, the finalize functions are still called
+    #  @param reason A message that describes why the run stopped, stored in population.stopReason
+    def requestStop(self, population, reason):
+        population.stopReason = reason
+    ## @fn getState(self)
+    #  @brief Return a dictionary with every property of the operator except the transientProperties, used by Scheduler.checkpoint
+    def getState(self):
+        return dict( (prop, value) for prop, value in vars(self).iteritems() if prop not in self.transientProperties )
+    ## @fn setState(self, state)
+    #  @brief Restore the properties returned by getState, the transientProperties are left unchanged
+    def setState(self, state):
+        self.__dict__.update(state)
+    ## @fn __getstate__(self)
+    #  @brief Pickle and deepcopy the operator with its transientProperties set to None
+    def __getstate__(self):
+        state = dict(vars(self))
+        for prop in self.transientProperties:
+            if prop in state:
+                state[prop] = None
+        return state
 
 ## @class BasePeriodicOperator
 #  @brief A class that serves as a base for all periodic operators
@@ -112,6 +151,8 @@ class BasePeriodicOperator(GeneticOperator):
     
 ## @class Mutate
 #  @brief Mutate an individual
+#
+#  The mutation loop itself is delegated to Population.mutate, so that array-backed populations can mutate all lethals at once
 class Mutate(GeneticOperator):
     def mutate(self, population):
         pm = getattr(population, 'mutation_probability', 0.01 )        
@@ -120,14 +161,14 @@ class Mutate(GeneticOperator):
         #  If population.lethals does not exist, update every individual (and set the lethals list to contain every index)
         if not lethals:
             lethals = range(len(population.individuals))
-        # Iterate over recently replaced individuals
-        for i in lethals:
-            if random.random() < pm:
-                population.individuals[i].mutate()
+        # Mutate the recently replaced individuals
+        population.mutate(lethals, pm)
     iterate = mutate
 
 ## @class Crossover
 #  @brief Crossover two individuals from population.matingPool with probability population.crossoverProbability
+#
+#  The offspring generation is delegated to Population.crossover, so that array-backed populations can produce all offspring at once
 class Crossover(GeneticOperator):
     def cross(self, population):
         pc = getattr(population, 'crossover_probability', 1.0 )
@@ -136,27 +177,13 @@ class Crossover(GeneticOperator):
         # If no vector is available, then all individuals are scheduled for replacement
         if not lethals:
             lethals = xrange(len(population.individuals))
-        # Get the number of individuals to replace
-        nLethals = len(lethals)
-        # Initialize a list of offspring vectors
-        offspring = [None] * nLethals        
         # Get the mating pool from the population
         matingPool = getattr(population, 'matingPool', None)
         # If no mating pool is available, raise an error
         if not matingPool:
             raise RuntimeError('No mating pool found on population, a selection operator must come before Crossover')
-        # Generate the offspring and insert them in different loops, to conserve the parents unchanged for crossover   
-        for i in xrange(nLethals):
-            offspring[i] = population.individuals[ matingPool[0] ]
-            if random.random() < pc:         
-                offspring[i] = offspring[i].crossover( population.individuals[matingPool[1]] )
-            # Make a deep copy of the new individual, to avoid a single segment to be referenced by several genotypes
-            offspring[i] = copy.deepcopy(offspring[i])
-            # Remove the first two parents from the mating pool
-            matingPool = matingPool[2:]
-        # Insert the offspring in the population
-        for i, o in zip(lethals, offspring):
-            population.individuals[i] = o
+        # Replace the lethals with the offspring of the mating pool
+        population.crossover(lethals, matingPool, pc)
     iterate = cross;
     
 ## @class BaseChromosomeSegment
@@ -187,7 +214,7 @@ class BaseChromosomeSegment(GABaseObject):
         # Set all named properties first
         super(BaseChromosomeSegment, self).__init__(**kwargs)
         ## @property data This property returns the data used to produce a Genotype
-        if data==None:
+        if data is None:
             # If no data was provided, randomize the chromosome segment
             self.randomize()
         else:
@@ -210,6 +237,12 @@ class BaseChromosomeSegment(GABaseObject):
     #  @brief This function is the mutation operator interface, and must be implemented for the default mutation functions to work 
     def mutate(self, chromo):
         pass
+    ## @fn clone(self)
+    #  @brief Return a new segment that contains a copy of self
+    #
+    #  The default implementation makes a deep copy of self. Specializations should overload this function to produce the copy through their own constructor, which is considerably cheaper.
+    def clone(self):
+        return copy.deepcopy(self)
 
 ## @class Genotype
 #  @brief The base Genotype class from which all chromosomes must derived
@@ -248,12 +281,17 @@ class Genotype(GABaseObject):
     ## @fn crossover(self, other)
     #  @brief Perform a one-point crossover between self an and other Genotype
     #  @return A Genotype object that contains the new genotype
-    #  @warning Segments are references to objects. It is recommended that 
+    #
+    #  The segments of the new genotype are clones, so they are never shared with self or other
     def crossover(self, other):
         crossPoint = random.randrange( len(self.segments) )
-        return Genotype( self.segments[:crossPoint] + \
+        return Genotype( [ s.clone() for s in self.segments[:crossPoint] ] + \
                            [ self.segments[crossPoint].crossover(other.segments[crossPoint]) ] + \
-                           other.segments[crossPoint+1:] )
+                           [ s.clone() for s in other.segments[crossPoint+1:] ] )
+    ## @fn clone(self)
+    #  @brief Return a new Genotype that contains a clone of every segment
+    def clone(self):
+        return Genotype( [ s.clone() for s in self.segments ] )
     ## @fn mutate(self)
     #  @brief Select one segment randomly and call mutate() on it
     def mutate(self):
@@ -323,9 +361,18 @@ class Individual(GABaseObject):
     #  @brief Crossover self and another genotype
     #  @return an Individual object containing the crossover of self and other
     def crossover(self, other):
-        offspring = copy.deepcopy(self)
-        offspring.genotype = offspring.genotype.crossover( other.genotype )
-        return offspring
+        return self.clone( genotype=self.genotype.crossover( other.genotype ) )
+    
+    ## @fn clone(self, genotype=None)
+    #  @brief Return a copy of self
+    #  @param genotype The genotype of the copy, a clone of self.genotype is used if omitted
+    #
+    #  The genotype is cloned segment by segment, while any other property is deep-copied
+    def clone(self, genotype=None):
+        if genotype is None:
+            genotype = self.genotype.clone()
+        properties = dict( (prop, copy.deepcopy(value)) for prop, value in vars(self).iteritems() if prop != 'genotype' )
+        return type(self)(genotype=genotype, **properties)
     
     ## @fn mutate
     #  @brief call mutate() on self's chromosome
@@ -365,7 +412,7 @@ class Population(GABaseObject):
     #  @brief Generate the list of individuals by copying the schema n times
     #  @param n The number of individuals to contain in the population
     def populate(self, n=100):
-        self.individuals = [ Individual(genotype=copy.deepcopy(self.schema)) for i in xrange(n) ]
+        self.individuals = [ Individual(genotype=self.schema.clone()) for i in xrange(n) ]
     
     ## @fn randomize(self)
     #  @brief Randomize the population by calling randomize on each individual
@@ -373,6 +420,247 @@ class Population(GABaseObject):
         for individual in self.individuals:
             individual.randomize()
 
+    ## @fn getState(self)
+    #  @brief Return a compact dictionary that contains the population, used by Scheduler.checkpoint
+    #
+    #  When every genotype has the layout of the schema, individuals are stored as a matrix of segment data, a fitness vector and their remaining properties, instead of as a graph of Individual, Genotype and segment objects.
+    def getState(self):
+        state = {'properties': dict( (prop, value) for prop, value in vars(self).iteritems() if prop != 'individuals' )}
+        nSegments = len(self.schema.segments)
+        if not all(len(individual.genotype.segments) == nSegments for individual in self.individuals):
+            state['individuals'] = self.individuals
+            return state
+        state['segmentData'] = self.segmentMatrix()
+        state['fitness']     = self.getFitness()
+        extra = [ dict( (prop, value) for prop, value in vars(individual).iteritems() if prop not in ('genotype', 'fitness') ) for individual in self.individuals ]
+        state['extra'] = extra if any(extra) else None
+        return state
+
+    ## @fn setState(self, state)
+    #  @brief Restore a population returned by getState, rebuilding the individuals from clones of the schema segments
+    def setState(self, state):
+        self.__dict__.update(state['properties'])
+        if 'individuals' in state:
+            self.individuals = state['individuals']
+            return
+        extra = state['extra'] or [{}] * len(state['fitness'])
+        self.individuals = [ self.buildIndividual(values, fitness, **properties) \
+                             for values, fitness, properties in zip(state['segmentData'], state['fitness'], extra) ]
+
+    ## @fn segmentMatrix(self, rows=None)
+    #  @brief Return segmentData(rows) as a numpy matrix, of an integer type if possible and of python objects otherwise
+    def segmentMatrix(self, rows=None):
+        data = self.segmentData(rows)
+        matrix = np.asarray(data)
+        return matrix if matrix.dtype.kind in 'iub' else np.array(data, dtype=object)
+
+    ## @fn buildIndividual(self, values, fitness=0.0, **kwargs)
+    #  @brief Build a new Individual whose genotype contains clones of the schema segments, filled with values
+    #  @param values The data of every segment
+    def buildIndividual(self, values, fitness=0.0, **kwargs):
+        values = values.tolist() if hasattr(values, 'tolist') else values
+        segments = [segment.clone() for segment in self.schema.segments]
+        for segment, value in zip(segments, values):
+            segment.data = value
+        return Individual(genotype=Genotype(segments), fitness=fitness, **kwargs)
+
+    ## @fn exportIndividuals(self, indices)
+    #  @brief Return a compact copy of the given individuals, made only of numpy arrays, that can be sent to another process
+    #  @return A dictionary with the segment data matrix and the fitness vector of the individuals
+    def exportIndividuals(self, indices):
+        return { 'segmentData' : self.segmentMatrix(indices),
+                 'fitness'     : np.asarray(self.getFitness(indices)) }
+
+    ## @fn importIndividuals(self, indices, payload)
+    #  @brief Replace the given individuals with the ones contained in a payload returned by exportIndividuals
+    def importIndividuals(self, indices, payload):
+        for i, values, fitness in zip(indices, payload['segmentData'], payload['fitness'].tolist()):
+            self.individuals[i] = self.buildIndividual(values, fitness)
+
+    ## @fn getFitness(self, indices=None)
+    #  @brief Return the fitness of the given individuals
+    #  @param indices A list of individual indices, every individual is used if omitted
+    def getFitness(self, indices=None):
+        if indices is None:
+            return [individual.fitness for individual in self.individuals]
+        return [self.individuals[i].fitness for i in indices]
+
+    ## @fn setFitness(self, indices, fitness)
+    #  @brief Assign fitness[j] to the individual pointed to by indices[j]
+    def setFitness(self, indices, fitness):
+        for i, f in zip(indices, fitness):
+            self.individuals[i].fitness = f
+
+    ## @fn segmentData(self, rows=None)
+    #  @brief Return the data of every segment in the genotypes of the given individuals
+    #  @param rows A list of individual indices, every individual is used if omitted
+    #  @return A list that contains, for each individual, the list of its segments' data
+    def segmentData(self, rows=None):
+        if rows is None:
+            rows = xrange(len(self.individuals))
+        return [ [segment.data for segment in self.individuals[i].genotype.segments] for i in rows ]
+
+    ## @fn genotypeKeys(self, rows=None)
+    #  @brief Return a hashable key for the genotype of each one of the given individuals
+    #
+    #  Two individuals have the same key if and only if all their segments contain the same data
+    def genotypeKeys(self, rows=None):
+        # Array segments (e.g. permutations) are not hashable, their bytes are used instead
+        return [tuple(value.tobytes() if isinstance(value, np.ndarray) else value for value in data) for data in self.segmentData(rows)]
+
+    ## @fn crossover(self, lethals, matingPool, pc=1.0)
+    #  @brief Replace the lethal individuals with the offspring of the mating pool
+    #  @param lethals A list of indices that point to the individuals to replace
+    #  @param matingPool A list of indices that point to the parents, the ith offspring is produced by matingPool[2*i] and matingPool[2*i+1]
+    #  @param pc The probability of crossing the parents, otherwise the offspring is a copy of the first parent
+    def crossover(self, lethals, matingPool, pc=1.0):
+        individuals = self.individuals
+        # Get the number of individuals to replace
+        nLethals = len(lethals)
+        # Initialize a list of offspring vectors
+        offspring = [None] * nLethals        
+        # Generate the offspring and insert them in different loops, to conserve the parents unchanged for crossover   
+        for i in xrange(nLethals):
+            # The ith offspring is produced by the parents at positions 2*i and 2*i+1 of the mating pool
+            parent = individuals[ matingPool[2*i] ]
+            # Both crossover and clone produce new segments, so no segment is referenced by several genotypes
+            if random.random() < pc:         
+                offspring[i] = parent.crossover( individuals[matingPool[2*i+1]] )
+            else:
+                offspring[i] = parent.clone()
+        # Insert the offspring in the population
+        for i, o in zip(lethals, offspring):
+            self.individuals[i] = o
+
+    ## @fn mutate(self, lethals, pm=0.01)
+    #  @brief Mutate each one of the lethal individuals with probability pm
+    #  @param lethals A list of indices that point to the individuals that may be mutated
+    #  @param pm The mutation probability
+    def mutate(self, lethals, pm=0.01):
+        for i in lethals:
+            if random.random() < pm:
+                self.individuals[i].mutate()
+
+## @fn peakMemory()
+#  @brief Return the peak resident set size of the current process in bytes, or None if it can not be measured
+def peakMemory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes on Mac OS X and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+## @class OperatorProfiler
+#  @brief Measure the wall time, the number of calls and optionally the memory allocated by every operator of a Scheduler, for each phase (initialize, iterate and finalize)
+#
+#  The profiler is enabled by passing it to the Scheduler constructor; without a profiler, the scheduler loops over its operators exactly as before.
+#  When trackMemory is set, the memory of each call is measured as the change of the memory traced by tracemalloc if it is available, and as the growth of the peak resident set size (in bytes) otherwise.
+#  At the end of the run, the summary table is printed if printSummary is set, and saved as JSON to path if it is provided.
+#  @code
+#    profiler = Core.OperatorProfiler(path='profile.json')
+#    ga = Core.Scheduler(population=p, operators=operators, profiler=profiler)
+#    ga.runGA(100)
+#  @endcode
+class OperatorProfiler(GABaseObject):
+    ## @fn __init__(self, trackMemory=False, path=None, printSummary=True, **kwargs)
+    #  @brief The profiler constructor
+    #  @param trackMemory Measure the memory allocated by every call, which slows down the run
+    #  @param path The JSON file where the summary is saved by report, the summary is not saved if omitted
+    #  @param printSummary Print the summary table in report
+    def __init__(self, trackMemory=False, path=None, printSummary=True, **kwargs):
+        super(OperatorProfiler, self).__init__(trackMemory=trackMemory, path=path, printSummary=printSummary, **kwargs)
+        self.reset()
+
+    ## @fn reset(self)
+    #  @brief Discard every measurement
+    def reset(self):
+        ## @property records A dictionary indexed by (operator index, phase) of [calls, seconds, memory] lists
+        self.records = {}
+        self.names = []
+
+    ## @fn start(self, operators)
+    #  @brief Prepare the records of a new run of the given operators
+    def start(self, operators):
+        self.reset()
+        self.names = [type(o).__name__ for o in operators]
+        if self.trackMemory and tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    ## @fn memory(self)
+    #  @brief Return the current memory measurement in bytes
+    def memory(self):
+        if tracemalloc is not None:
+            return tracemalloc.get_traced_memory()[0]
+        return peakMemory() or 0
+
+    ## @fn run(self, phase, operators, population)
+    #  @brief Call the given phase function of every operator on population, and record the measurements
+    #  @param phase 'initialize', 'iterate' or 'finalize'
+    def run(self, phase, operators, population):
+        # A resumed run starts without the initialize phase
+        if len(self.names) != len(operators):
+            self.names = [type(o).__name__ for o in operators]
+        timer = time.time
+        for i, o in enumerate(operators):
+            before = self.memory() if self.trackMemory else 0
+            start = timer()
+            getattr(o, phase)(population)
+            seconds = timer() - start
+            record = self.records.get((i, phase))
+            if record is None:
+                record = self.records[(i, phase)] = [0, 0.0, 0]
+            record[0] += 1
+            record[1] += seconds
+            if self.trackMemory:
+                record[2] += self.memory() - before
+
+    ## @fn summary(self)
+    #  @brief Return the measurements as a list of dictionaries, one per operator and phase, in the order of the operators
+    def summary(self):
+        total = sum(record[1] for record in self.records.itervalues()) or 1.0
+        rows = []
+        for (i, phase), (calls, seconds, memory) in sorted(self.records.iteritems(), \
+                                                           key=lambda item: (item[0][0], ('initialize', 'iterate', 'finalize').index(item[0][1]))):
+            row = { 'index'        : i,
+                    'operator'     : self.names[i],
+                    'phase'        : phase,
+                    'calls'        : calls,
+                    'seconds'      : seconds,
+                    'secondsPerCall' : seconds / calls,
+                    'fraction'     : seconds / total }
+            if self.trackMemory:
+                row['memory'] = memory
+            rows.append(row)
+        return rows
+
+    ## @fn table(self)
+    #  @brief Return the summary as a text table
+    def table(self):
+        header = '%3s  %-24s %-10s %8s %12s %12s %7s' % ('#', 'operator', 'phase', 'calls', 'seconds', 's/call', '%')
+        if self.trackMemory:
+            header += ' %14s' % 'memory (B)'
+        lines = [header]
+        for row in self.summary():
+            line = '%3d  %-24s %-10s %8d %12.6f %12.3e %6.1f%%' % (row['index'], row['operator'][:24], row['phase'], row['calls'], \
+                                                                  row['seconds'], row['secondsPerCall'], 100.0*row['fraction'])
+            if self.trackMemory:
+                line += ' %14d' % row['memory']
+            lines.append(line)
+        return '\n'.join(lines)
+
+    ## @fn report(self)
+    #  @brief Print the summary table and save the JSON summary, as configured; called by Scheduler.finalize
+    def report(self):
+        if self.printSummary:
+            print self.table()
+        if self.path:
+            with open(self.path, 'w') as jsonFile:
+                json.dump(self.summary(), jsonFile, indent=2)
+
+## @var checkpointVersion
+#  @brief The version of the checkpoint format written by Scheduler.checkpoint
+checkpointVersion = 1
+
 ## @class Scheduler
 #  @brief A class that encapsulates a Population and a list of GeneticOperator
 #
@@ -384,11 +672,29 @@ class Population(GABaseObject):
 #    <li>iterate</li>
 #    <li>initialize</li>
 #  <ul>
+#
+#  Any operator can end the run early by calling GeneticOperator.requestStop, which sets population.stopReason: the current iteration is completed and the finalize phase still runs.
+#  The TerminationOperators module provides time, evaluation, target fitness and stagnation criteria, which should be placed after the evaluation operators.
+#
+#  If a profiler (see OperatorProfiler) is provided, the time spent by every operator in each phase is measured and reported at the end of the run.
+#
+#  If checkpointPath and checkpointFrequency are provided, runGA saves a checkpoint every checkpointFrequency iterations. An interrupted run is continued by building the same scheduler and calling resume:
+#  @code
+#    ga = Core.Scheduler(population=p, operators=operators, checkpointPath='run.ckpt', checkpointFrequency=100)
+#    ga.runGA(10000)
+#    # ... after the run was killed, in a new process
+#    ga = Core.Scheduler(population=p, operators=operators, checkpointPath='run.ckpt', checkpointFrequency=100)
+#    ga.resume()
+#  @endcode
 class Scheduler(GABaseObject):
-    ## @fn __init__(self, name='Untitled', operators=[], population=Population()):
+    ## @fn __init__(self, name='Untitled', operators=[], population=Population(), checkpointPath=None, checkpointFrequency=None, profiler=None, **kwargs):
     #  @brief GAScheduler
-    def __init__(self, name='Untitled', operators=[], population=Population(), **kwargs):
-        super(Scheduler, self).__init__(name=name, operators=operators, population=population, **kwargs)
+    #  @param checkpointPath The file where runGA saves its checkpoints
+    #  @param checkpointFrequency The number of iterations between checkpoints, checkpoints are disabled if omitted
+    #  @param profiler An OperatorProfiler that measures every operator call, profiling is disabled if omitted
+    def __init__(self, name='Untitled', operators=[], population=Population(), checkpointPath=None, checkpointFrequency=None, profiler=None, **kwargs):
+        super(Scheduler, self).__init__(name=name, operators=operators, population=population, \
+                                        checkpointPath=checkpointPath, checkpointFrequency=checkpointFrequency, profiler=profiler, **kwargs)
     ## @fn __str__(self)
     #  @brief Return the string representation of the scheduler
     def __str__(self):
@@ -402,6 +708,10 @@ class Scheduler(GABaseObject):
     #
     #  This function calls the initialize function of every operator on population once. Genetic operators are expected to initialize any variables 
     def initialize(self):
+        if self.profiler is not None:
+            self.profiler.start(self.operators)
+            self.profiler.run('initialize', self.operators, self.population)
+            return
         for o in self.operators:
             o.initialize(self.population)
 
@@ -410,6 +720,9 @@ class Scheduler(GABaseObject):
     # 
     #  Every operator iterate method over self.population
     def iterate(self):
+        if self.profiler is not None:
+            self.profiler.run('iterate', self.operators, self.population)
+            return
         for o in self.operators:
             o.iterate(self.population)
     
@@ -418,14 +731,83 @@ class Scheduler(GABaseObject):
     #
     #  Callthe finalize method of every operator at the end of runGA
     def finalize(self):
+        if self.profiler is not None:
+            self.profiler.run('finalize', self.operators, self.population)
+            self.profiler.report()
+            return
         for o in self.operators:
             o.finalize(self.population)
     
     ## @fn runGA
     #  @brief Initialize, run n iterations and finalize the GA run
-    #  @param n The number of iterations to run
+    #  @param n The maximum number of iterations to run, the run ends earlier if an operator requests a stop
     def runGA(self, n):
+        self.population.__dict__.pop('stopReason', None)
         self.initialize()
-        for i in xrange(n):
+        self.runIterations(0, n)
+
+    ## @fn runIterations(self, start, n)
+    #  @brief Run the iterations start to n-1, saving checkpoints as configured, and finalize the GA run
+    #
+    #  The loop ends before n if population.stopReason is set, see GeneticOperator.requestStop
+    def runIterations(self, start, n):
+        for i in xrange(start, n):
+            if getattr(self.population, 'stopReason', None):
+                break
             self.iterate()
+            if self.checkpointPath and self.checkpointFrequency and ((i+1) % self.checkpointFrequency) == 0:
+                self.checkpoint(self.checkpointPath, i+1, n)
         self.finalize()
+
+    ## @fn checkpoint(self, path, iteration, n)
+    #  @brief Save the population, the state of every operator and the state of the random number generators to path
+    #  @param iteration The number of iterations completed so far
+    #  @param n The total number of iterations of the run
+    #
+    #  The checkpoint is written with the highest pickle protocol, so the numpy arrays of the population state are stored as raw binary data.
+    #  It is first written to a temporary file, which then replaces path, so an interrupted checkpoint never corrupts the previous one.
+    def checkpoint(self, path, iteration, n):
+        state = { 'version'    : checkpointVersion,
+                  'iteration'  : iteration,
+                  'iterations' : n,
+                  'population' : self.population.getState(),
+                  'operators'  : [ (type(o).__name__, o.getState()) for o in self.operators ],
+                  'random'     : random.getstate(),
+                  'numpy'      : np.random.get_state() }
+        temporaryPath = path + '.tmp'
+        with open(temporaryPath, 'wb') as checkpointFile:
+            cPickle.dump(state, checkpointFile, cPickle.HIGHEST_PROTOCOL)
+            checkpointFile.flush()
+            os.fsync(checkpointFile.fileno())
+        # os.rename does not replace existing files on Windows
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(temporaryPath, path)
+
+    ## @fn restore(self, path)
+    #  @brief Load a checkpoint saved by checkpoint into the population, the operators and the random number generators
+    #  @return A tuple (iteration, n) with the number of completed iterations and the total number of iterations of the checkpointed run
+    #
+    #  The scheduler must have been built with the same list of operators as the one that saved the checkpoint.
+    def restore(self, path):
+        with open(path, 'rb') as checkpointFile:
+            state = cPickle.load(checkpointFile)
+        if state.get('version') != checkpointVersion:
+            raise ValueError('Unsupported checkpoint version in %s' % path)
+        if [name for name, operatorState in state['operators']] != [type(o).__name__ for o in self.operators]:
+            raise ValueError('The operators of the scheduler do not match the operators saved in %s' % path)
+        self.population.setState(state['population'])
+        for o, (name, operatorState) in zip(self.operators, state['operators']):
+            o.setState(operatorState)
+        random.setstate(state['random'])
+        np.random.set_state(state['numpy'])
+        return state['iteration'], state['iterations']
+
+    ## @fn resume(self, path=None)
+    #  @brief Restore a checkpoint and run the remaining iterations of the checkpointed run, as if it had never been interrupted
+    #  @param path The checkpoint file, self.checkpointPath is used if omitted
+    #
+    #  The initialize phase is not repeated, so the run continues exactly where the checkpoint was saved.
+    def resume(self, path=None):
+        iteration, n = self.restore(path or self.checkpointPath)
+        self.runIterations(iteration, n)
@@ -1,24 +1,215 @@
 import Core
 
+import copy
+import math
+import time
+import collections
+import multiprocessing
+
 ## @class BaseEvaluationOperator
 #  @brief This class provides an easy way of developing evaluation operators that only evaluate recently replaced individuals
+#
+#  Derived operators may overload either evaluateIndividual, to evaluate one individual at a time, or evaluateBatch, to evaluate every recently replaced individual at once (e.g. as a matrix operation over population.segmentData(lethals))
 class BaseEvaluationOperator(Core.GeneticOperator):
     ## @fn evaluateIndividual(self, individual)
     #  @brief This function evaluates one individual; Overload this function on all derived operators
     def evaluateIndividual(self, individual):
         individual.fitness = 0.0
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief This function evaluates a batch of individuals, and returns their fitness values
+    #  @param population The population that contains the individuals to evaluate
+    #  @param lethals A list of indices that point to the individuals to evaluate
+    #  @return A sequence that contains the fitness of every individual pointed to by lethals, in the same order
+    #
+    #  The default implementation calls evaluateIndividual on every individual of the batch. Overload this function to implement vectorized evaluation functions
+    def evaluateBatch(self, population, lethals):
+        individuals = [population.individuals[i] for i in lethals]
+        for individual in individuals:
+            self.evaluateIndividual(individual)
+        return [individual.fitness for individual in individuals]
     ## @fn evaluate(self, population)
-    #  @brief This function applies the evaluateIndividual function to every recently replaced individual in the population
+    #  @brief This function evaluates every recently replaced individual in the population as a single batch, and stores the resulting fitness values
     def evaluate(self, population):
         # Evaluate only recently generated items (pointed to by population.lethals)        
         lethals = getattr(population, 'lethals', None )
         #  If population.lethals does not exist, update every individual (and set the lethals list to contain every index)
         if not lethals:
             lethals = range(len(population.individuals))        
-        # Iterate over recently replaced individuals
-        for i in lethals:
-            self.evaluateIndividual(population.individuals[i])
+        # Evaluate the recently replaced individuals and scatter their fitness back to the population
+        population.setFitness(lethals, self.evaluateBatch(population, lethals))
             
     initialize = evaluate
     iterate    = evaluate
     finalize   = evaluate
+
+## @var workerState
+#  @brief The evaluation operator and genotype schema of a ParallelEvaluation worker process, set once by initializeWorker
+workerState = {}
+
+## @fn initializeWorker(operator, schema)
+#  @brief Store the evaluation operator and the genotype schema in the worker process, so they are sent only once per pool
+def initializeWorker(operator, schema):
+    workerState['operator'] = operator
+    workerState['schema']   = schema
+
+## @fn evaluateChunk(chunk)
+#  @brief Rebuild the individuals of a chunk inside a worker process and evaluate them
+#  @param chunk A list of (segmentData, phenotype) tuples, phenotype is None for individuals that have no phenotype
+#  @return The list of fitness values of the chunk
+def evaluateChunk(chunk):
+    operator, schema = workerState['operator'], workerState['schema']
+    individuals = []
+    for data, phenotype in chunk:
+        # Clone the schema segments and fill them with the individual data
+        segments = [copy.copy(segment) for segment in schema.segments]
+        for segment, value in zip(segments, data):
+            segment.data = value
+        individual = Core.Individual(genotype=Core.Genotype(segments))
+        if phenotype is not None:
+            individual.phenotype = phenotype
+        individuals.append(individual)
+    population = Core.Population(individuals=individuals)
+    return list(operator.evaluateBatch(population, xrange(len(individuals))))
+
+## @class ParallelEvaluation
+#  @brief An evaluation operator that distributes the evaluation of the recently replaced individuals of another evaluation operator over a pool of processes
+#
+#  Only the segment data and the phenotype of every individual are sent to the workers, and only the fitness values are sent back.
+#  The wrapped operator and the population schema are sent once, when the pool is started on the first evaluation. The pool is kept alive across iterations and closed by finalize.
+#  The lethals are split in chunks whose size adapts to the measured evaluation time, so that each chunk takes about chunkTime seconds.
+#  @code
+#    ParallelEvaluation(operator=GraphLibrary.PathLengthFitness(graph=instanceGraph), processes=4)
+#  @endcode
+class ParallelEvaluation(BaseEvaluationOperator):
+    transientProperties = ('pool',)
+    ## @fn __init__(self, operator=None, processes=None, chunkTime=0.05, **kwargs)
+    #  @brief The genetic operator constructor
+    #  @param operator The BaseEvaluationOperator derivate used to evaluate individuals, it must be picklable
+    #  @param processes The number of worker processes, the number of cpus is used if omitted
+    #  @param chunkTime The approximate time, in seconds, that the evaluation of a chunk should take
+    def __init__(self, operator=None, processes=None, chunkTime=0.05, **kwargs):
+        super(ParallelEvaluation, self).__init__(**kwargs)
+        if operator==None:
+            operator = BaseEvaluationOperator()
+        self.operator  = operator
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunkTime = chunkTime
+        ## @property secondsPerIndividual A moving average of the evaluation time of an individual, as measured on previous batches
+        self.secondsPerIndividual = None
+        self.pool = None
+
+    ## @fn startPool(self, population)
+    #  @brief Start the worker processes, sending them the evaluation operator and the population schema
+    def startPool(self, population):
+        self.pool = multiprocessing.Pool(self.processes, initializeWorker, (self.operator, population.schema))
+
+    ## @fn closePool(self)
+    #  @brief Terminate the worker processes
+    def closePool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    ## @fn chunkSize(self, n)
+    #  @brief Compute the number of individuals per chunk to evaluate n individuals
+    #
+    #  Before any measurement is available, every process receives four chunks. Afterwards, chunks hold as many individuals as can be evaluated in chunkTime seconds, with at least one individual and at most an even share of n per process.
+    def chunkSize(self, n):
+        share = int(math.ceil(float(n) / self.processes))
+        if not self.secondsPerIndividual:
+            return max(1, int(math.ceil(share / 4.0)))
+        return max(1, min(share, int(round(self.chunkTime / self.secondsPerIndividual))))
+
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Evaluate the lethals on the worker processes
+    def evaluateBatch(self, population, lethals):
+        if self.pool is None:
+            self.startPool(population)
+        data = population.segmentData(lethals)
+        data = data.tolist() if hasattr(data, 'tolist') else data
+        payload = [ (row, getattr(population.individuals[i], 'phenotype', None)) for row, i in zip(data, lethals) ]
+        size = self.chunkSize(len(payload))
+        chunks = [ payload[j:j+size] for j in xrange(0, len(payload), size) ]
+        start = time.time()
+        fitness = [f for chunkFitness in self.pool.map(evaluateChunk, chunks) for f in chunkFitness]
+        # Update the moving average of the evaluation time per individual
+        measured = (time.time() - start) * min(self.processes, len(chunks)) / max(1, len(payload))
+        if self.secondsPerIndividual:
+            measured = 0.5 * (self.secondsPerIndividual + measured)
+        self.secondsPerIndividual = measured
+        return fitness
+
+    ## @fn finalize(self, population)
+    #  @brief Evaluate the population one last time and terminate the worker processes
+    def finalize(self, population):
+        self.evaluate(population)
+        self.closePool()
+
+## @class CachedEvaluation
+#  @brief An evaluation operator that memoizes the fitness computed by another evaluation operator
+#
+#  Individuals are identified by Population.genotypeKeys, so clones produced by Crossover and Mutate are only evaluated once.
+#  At most maxSize fitness values are kept, the least recently used entry is evicted whenever the cache is full.
+#  The hits, misses and evictions counters can be used to measure the effectiveness of the cache.
+#  @note Only the fitness is cached, any other property set by the wrapped operator (e.g. a phenotype) is not set on cache hits.
+#  @code
+#    CachedEvaluation(operator=GraphLibrary.PathLengthFitness(graph=instanceGraph), maxSize=10000)
+#  @endcode
+class CachedEvaluation(BaseEvaluationOperator):
+    ## @fn __init__(self, operator=None, maxSize=10000, **kwargs)
+    #  @brief The genetic operator constructor
+    #  @param operator The BaseEvaluationOperator derivate used to evaluate the individuals that are not cached
+    #  @param maxSize The maximum number of fitness values kept in the cache
+    def __init__(self, operator=None, maxSize=10000, **kwargs):
+        super(CachedEvaluation, self).__init__(**kwargs)
+        if operator==None:
+            operator = BaseEvaluationOperator()
+        self.operator  = operator
+        self.maxSize   = maxSize
+        ## @property cache The cached fitness values, ordered from the least to the most recently used
+        self.cache     = collections.OrderedDict()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    ## @fn hitRate(self)
+    #  @brief Return the fraction of evaluations that were served from the cache
+    def hitRate(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Look up the lethals in the cache, and evaluate only the genotypes that are not cached with the wrapped operator
+    def evaluateBatch(self, population, lethals):
+        keys = population.genotypeKeys(lethals)
+        # Collect the first lethal of every genotype that is not cached
+        missing = collections.OrderedDict()
+        for i, key in zip(lethals, keys):
+            if key not in self.cache and key not in missing:
+                missing[key] = i
+        self.misses += len(missing)
+        self.hits   += len(keys) - len(missing)
+        if missing:
+            fitness = self.operator.evaluateBatch(population, list(missing.itervalues()))
+            for key, f in zip(missing.iterkeys(), fitness):
+                self.cache[key] = f
+        # Gather the fitness values, moving them to the most recently used end of the cache
+        result = []
+        for key in keys:
+            f = self.cache.pop(key)
+            self.cache[key] = f
+            result.append(f)
+        # Evict the least recently used entries
+        while len(self.cache) > self.maxSize:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    ## @fn finalize(self, population)
+    #  @brief Evaluate the population one last time, and release the resources of the wrapped operator (e.g. the ParallelEvaluation process pool)
+    def finalize(self, population):
+        self.evaluate(population)
+        closePool = getattr(self.operator, 'closePool', None)
+        if closePool:
+            closePool()
@@ -1,5 +1,6 @@
 import copy
 import random
+import numpy as np
 from Core import *
 
 ## @class BinaryChromosomeSegment
@@ -59,3 +60,493 @@ class BinaryChromosomeSegment(BaseChromosomeSegment):
     def mutate(self):
         self.data = self.data ^ (1<<random.randint(0,self.nBits-1))
 
+    ## @fn clone(self)
+    #  @brief Return a new BinaryChromosomeSegment with the same properties as self, built through the constructor
+    def clone(self):
+        return type(self)(**vars(self))
+
+
+## @fn permutationType(n)
+#  @brief Return the smallest unsigned integer type that holds the nodes of a permutation of n elements
+def permutationType(n):
+    return np.uint16 if n <= (1<<16) else np.uint32
+
+## @fn orderCrossover(first, second)
+#  @brief Order crossover (OX) of two permutations, in O(n)
+#  @return A child that keeps a random section of first in place, and the rest of the nodes in the order they appear in second, starting after the section
+def orderCrossover(first, second):
+    n = len(first)
+    a, b = sorted(random.sample(xrange(n+1), 2))
+    child = np.empty_like(first)
+    child[a:b] = first[a:b]
+    taken = np.zeros(n, dtype=bool)
+    taken[first[a:b]] = True
+    order = np.roll(second, -b)
+    child[np.roll(np.arange(n), -b)[:n-(b-a)]] = order[~taken[order]]
+    return child
+
+## @fn partiallyMappedCrossover(first, second)
+#  @brief Partially mapped crossover (PMX) of two permutations, in O(n)
+#  @return A child that keeps a random section of first in place, and the positions of second elsewhere, following the mapping of the section for the conflicting nodes
+#
+#  The child is produced as a copy of second where, for each position i of the section, the node first[i] is swapped into position i.
+def partiallyMappedCrossover(first, second):
+    n = len(first)
+    a, b = sorted(random.sample(xrange(n+1), 2))
+    child = second.tolist()
+    position = [0] * n
+    for i, node in enumerate(child):
+        position[node] = i
+    for i, node in enumerate(first[a:b].tolist(), a):
+        j = position[node]
+        child[i], child[j] = node, child[i]
+        position[child[j]], position[node] = j, i
+    return np.array(child, dtype=first.dtype)
+
+## @fn edgeRecombination(first, second)
+#  @brief Edge recombination crossover (ERX) of two permutations, in O(n)
+#  @return A child tour built mostly from the edges of the parent tours
+#
+#  The child starts with the first node of first. Each next node is the unvisited neighbour (in either parent) that has the fewest unvisited neighbours left, ties are broken at random.
+#  If the current node has no unvisited neighbour, a random unvisited node is taken.
+def edgeRecombination(first, second):
+    n = len(first)
+    neighbours = [set() for i in xrange(n)]
+    for parent in (first.tolist(), second.tolist()):
+        for i, node in enumerate(parent):
+            neighbours[node].add(parent[i-1])
+            neighbours[node].add(parent[(i+1) % n])
+    # Unvisited nodes are drawn in a random order when the tour gets stuck
+    spare = np.random.permutation(n).tolist()
+    visited = [False] * n
+    child = []
+    node = int(first[0])
+    while True:
+        child.append(node)
+        visited[node] = True
+        for other in neighbours[node]:
+            neighbours[other].discard(node)
+        if len(child) == n:
+            break
+        candidates = neighbours[node]
+        if candidates:
+            fewest = min(len(neighbours[c]) for c in candidates)
+            node = random.choice([c for c in candidates if len(neighbours[c]) == fewest])
+        else:
+            while visited[spare[-1]]:
+                spare.pop()
+            node = spare.pop()
+    return np.array(child, dtype=first.dtype)
+
+## @class PermutationChromosomeSegment
+#  @brief This class implements a permutation of the numbers 0:nNodes, stored in a compact integer array
+#
+#  The permutation can be used directly as a tour (e.g. by GraphLibrary.PathLengthFitness with useGenotype set), with no decoding stage.
+#  The crossoverType property selects the crossover: 'ox' (orderCrossover), 'pmx' (partiallyMappedCrossover) or 'edge' (edgeRecombination).
+#  The mutationType property selects the mutation: 'swap' exchanges two random nodes, 'inversion' reverses a random section.
+class PermutationChromosomeSegment(BaseChromosomeSegment):
+    ## @var crossoverFunctions
+    #  @brief The crossover functions, indexed by crossoverType
+    crossoverFunctions = { 'ox' : orderCrossover, 'pmx' : partiallyMappedCrossover, 'edge' : edgeRecombination }
+
+    ## @fn __init__(self, nNodes=2, data=None, crossoverType='ox', mutationType='inversion', **kwargs)
+    #  @param nNodes The length of the permutation
+    #  @param data The permutation, a random permutation is generated if omitted
+    #  @param crossoverType 'ox', 'pmx' or 'edge'
+    #  @param mutationType 'swap' or 'inversion'
+    def __init__(self, nNodes=2, data=None, crossoverType='ox', mutationType='inversion', **kwargs):
+        if crossoverType not in self.crossoverFunctions:
+            raise ValueError('Unknown crossover type %r' % crossoverType)
+        if mutationType not in ('swap', 'inversion'):
+            raise ValueError('Unknown mutation type %r' % mutationType)
+        super(PermutationChromosomeSegment, self).__init__(nNodes=nNodes, data=data, crossoverType=crossoverType, mutationType=mutationType, **kwargs)
+
+    ## @fn __str__(self)
+    #  @brief Return the permutation as a list of nodes
+    def __str__(self):
+        return str(self.data.tolist())
+
+    ## @fn __setattr__(self, attr, value)
+    #  @brief This function stores data as an array of the type given by permutationType
+    def __setattr__(self, attr, value):
+        if attr=='nNodes':
+            value = int(value)
+        elif attr=='data':
+            value = np.array(value, dtype=permutationType(self.nNodes)).reshape(-1)
+            if len(value) != self.nNodes:
+                raise ValueError('A permutation of %d nodes was expected' % self.nNodes)
+        super(PermutationChromosomeSegment, self).__setattr__(attr, value)
+
+    ## @fn randomize(self)
+    #  @brief Set the chromosome to a random permutation
+    def randomize(self):
+        self.data = np.random.permutation(self.nNodes)
+
+    ## @fn crossover(self, other)
+    #  @brief Cross two permutations with the function selected by crossoverType
+    #  @return A new PermutationChromosomeSegment object that contains the child
+    def crossover(self, other):
+        return type(self)(nNodes=self.nNodes, data=self.crossoverFunctions[self.crossoverType](self.data, other.data), \
+                          crossoverType=self.crossoverType, mutationType=self.mutationType)
+
+    ## @fn mutate(self)
+    #  @brief Exchange two random nodes, or reverse a random section, according to mutationType
+    def mutate(self):
+        if self.mutationType == 'swap':
+            i, j = random.sample(xrange(self.nNodes), 2)
+            self.data[[i, j]] = self.data[[j, i]]
+        else:
+            i, j = sorted(random.sample(xrange(self.nNodes+1), 2))
+            self.data[i:j] = self.data[i:j][::-1]
+
+    ## @fn clone(self)
+    #  @brief Return a new PermutationChromosomeSegment with a copy of the permutation
+    def clone(self):
+        return type(self)(nNodes=self.nNodes, data=self.data, crossoverType=self.crossoverType, mutationType=self.mutationType)
+
+## @fn packSegmentData(data, segmentBits)
+#  @brief Pack a matrix of segment values into rows of bits, laid out as in BinaryPopulation.genes
+#  @param data A (nRows x nSegments) matrix (or list of lists) of non-negative integers
+#  @param segmentBits The number of bits of every segment
+#  @return A numpy uint8 matrix of shape (nRows, ceil(sum(segmentBits)/8))
+def packSegmentData(data, segmentBits):
+    wide = len(segmentBits) and max(segmentBits) > 64
+    # Lists are converted through python integers, so values above 2**63 are not rounded to floats
+    if not (isinstance(data, np.ndarray) and data.dtype.kind in 'ui'):
+        data = np.array(data, dtype=object).reshape(len(data), len(segmentBits))
+    # Segments wider than 64 bits are kept as python integers
+    data = data.astype(object if wide else np.uint64)
+    integer = int if wide else np.uint64
+    bits = np.zeros((len(data), int(np.sum(segmentBits))), dtype=np.uint8)
+    offset = 0
+    for j, nBits in enumerate(segmentBits):
+        for b in xrange(nBits):
+            bits[:, offset+b] = (data[:, j] >> integer(nBits-1-b)) & integer(1)
+        offset += nBits
+    return np.packbits(bits, axis=1)
+
+## @fn unpackSegmentData(genes, segmentBits)
+#  @brief Compute the segment values contained in rows of packed bits, the inverse of packSegmentData
+#  @param genes A numpy uint8 matrix of packed rows
+#  @param segmentBits The number of bits of every segment
+#  @return A (nRows x nSegments) matrix, of type uint64 if every segment fits in 64 bits and of python integers otherwise
+def unpackSegmentData(genes, segmentBits):
+    segmentBits = np.asarray(segmentBits, dtype=np.int64)
+    wide = len(segmentBits) and segmentBits.max() > 64
+    bits = np.unpackbits(np.asarray(genes, dtype=np.uint8).reshape(len(genes), -1), axis=1)
+    data = np.zeros((len(genes), len(segmentBits)), dtype=object if wide else np.uint64)
+    one  = 1 if wide else np.uint64(1)
+    offset = 0
+    for j, nBits in enumerate(segmentBits):
+        for bit in bits[:, offset:offset+nBits].T:
+            data[:, j] = (data[:, j] << one) | bit.astype(data.dtype)
+        offset += nBits
+    return data
+
+## @class BinaryIndividual
+#  @brief A lightweight Individual that points to one row of a BinaryPopulation
+#
+#  Reading the genotype decodes the row into a Genotype of BinaryChromosomeSegment objects, and assigning a genotype encodes it back into the row.
+#  The fitness is read from and written to the population fitness vector, so the existing evaluation operators work without changes.
+#  Any other property (e.g. phenotype) is stored on the view itself. A deep copy produces a regular, detached Individual.
+class BinaryIndividual(Individual):
+    ## @fn __init__(self, population, row)
+    #  @brief Create a view over a row of population
+    #  @param population The BinaryPopulation that stores the genotype and fitness
+    #  @param row The row index of this individual in the population matrix
+    def __init__(self, population, row):
+        object.__setattr__(self, 'population', population)
+        object.__setattr__(self, 'row', row)
+
+    ## @fn genotype
+    #  @brief The Genotype stored in the population row, decoded on every access
+    @property
+    def genotype(self):
+        return self.population.decodeRow(self.row)
+
+    @genotype.setter
+    def genotype(self, genotype):
+        self.population.encodeRow(self.row, genotype)
+
+    ## @fn fitness
+    #  @brief The fitness stored in the population fitness vector
+    @property
+    def fitness(self):
+        return self.population.fitness[self.row]
+
+    @fitness.setter
+    def fitness(self, value):
+        self.population.fitness[self.row] = value
+
+    ## @fn properties(self)
+    #  @brief Return a list of (name, value) tuples with the genotype, the fitness and every user-defined property
+    def properties(self):
+        extra = [(prop, value) for prop, value in vars(self).iteritems() if prop not in ('population', 'row')]
+        return [('genotype', self.genotype), ('fitness', self.fitness)] + extra
+
+    ## @fn detach(self)
+    #  @brief Return a regular Individual that contains a copy of this view, independent of the population
+    def detach(self):
+        return self.clone()
+
+    ## @fn clone(self, genotype=None)
+    #  @brief Return a regular Individual that contains a copy of this view
+    #  @param genotype The genotype of the copy, the decoded row is used if omitted
+    def clone(self, genotype=None):
+        if genotype is None:
+            genotype = self.genotype
+        properties = dict( (prop, copy.deepcopy(value)) for prop, value in self.properties() if prop != 'genotype' )
+        return Individual(genotype=genotype, **properties)
+
+    def __deepcopy__(self, memo):
+        return self.detach()
+
+    def __repr__(self):
+        return repr(self.detach())
+
+    def valuesToStr(self, separator='\t'):
+        return separator.join( [str(value) for prop, value in self.properties()] )
+
+    def propertiesToStr(self, separator='\t'):
+        return separator.join( [str(prop) for prop, value in self.properties()] )
+
+    ## @fn randomize(self)
+    #  @brief Randomize the population row
+    def randomize(self):
+        self.population.randomizeRows([self.row])
+
+    ## @fn mutate(self)
+    #  @brief Flip a single bit of the population row
+    def mutate(self):
+        self.population.mutateRows([self.row])
+
+## @class BinaryIndividuals
+#  @brief The sequence of BinaryIndividual views used as BinaryPopulation.individuals
+#
+#  Assigning an Individual to an item copies its genotype, fitness and properties into the corresponding row.
+class BinaryIndividuals(GABaseObject):
+    def __init__(self, population):
+        self.population = population
+        self.views = [BinaryIndividual(population, row) for row in xrange(len(population.fitness))]
+
+    def __len__(self):
+        return len(self.views)
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __getitem__(self, index):
+        return self.views[index]
+
+    def __setitem__(self, index, individual):
+        view = self.views[index]
+        if individual is view:
+            return
+        view.genotype = individual.genotype
+        view.fitness  = individual.fitness
+        for prop, value in vars(individual).iteritems():
+            if prop not in ('genotype', 'fitness', 'population', 'row'):
+                setattr(view, prop, value)
+
+    def __repr__(self):
+        return '[%s]' % ', '.join(repr(view) for view in self.views)
+
+## @class BinaryPopulation
+#  @brief A Population that stores every genotype as a row of a packed bit matrix
+#
+#  The schema must be a Genotype made of BinaryChromosomeSegment objects. Its segments are laid out once, most significant bit first and one after the other, in rows of nBits bits packed in bytes:
+#  <ul>
+#    <li>genes: A numpy uint8 matrix of shape (popSize, ceil(nBits/8)), the padding bits at the end of every row are always zero</li>
+#    <li>fitness: A numpy float64 vector of length popSize</li>
+#    <li>individuals: A sequence of BinaryIndividual views, so the per-individual operators keep working</li>
+#  </ul>
+#  Randomization, crossover and mutation operate on many rows at once, and are used by Core.Crossover and Core.Mutate through the Population.crossover and Population.mutate interface.
+#  @note The vectorized operators use numpy.random, so numpy.random.seed must be used together with random.seed to obtain repeatable runs.
+class BinaryPopulation(Population):
+    ## @fn __init__(self, name='', schema=Genotype(), popSize=100, maximize=True, **kwargs)
+    #  @brief The BinaryPopulation constructor
+    #  @param schema A Genotype of BinaryChromosomeSegment objects that defines the segment boundaries
+    #  @param popSize The number of rows in the population matrix
+    def __init__(self, name='', schema=Genotype(), popSize=100, maximize=True, **kwargs):
+        super(BinaryPopulation, self).__init__(name=name, schema=schema, popSize=popSize, maximize=maximize, **kwargs)
+
+    ## @fn updateLayout(self)
+    #  @brief Compute the segment boundaries from the schema
+    def updateLayout(self):
+        ## @property segmentBits The number of bits of every segment
+        self.segmentBits    = np.array([segment.nBits for segment in self.schema.segments], dtype=np.int64)
+        ## @property segmentOffsets The position of the first bit of every segment within a row
+        self.segmentOffsets = np.concatenate(([0], np.cumsum(self.segmentBits)[:-1])).astype(np.int64)
+        ## @property nBits The number of bits in a row
+        self.nBits  = int(self.segmentBits.sum())
+        ## @property nBytes The number of bytes in a row
+        self.nBytes = (self.nBits + 7) // 8
+
+    ## @fn populate(self, n=100)
+    #  @brief Allocate the genotype matrix and the fitness vector for n individuals, and fill them with the schema
+    def populate(self, n=100):
+        self.updateLayout()
+        self.fitness = np.zeros(n, dtype=np.float64)
+        self.genes   = np.zeros((n, self.nBytes), dtype=np.uint8)
+        self.genes[:] = self.encodeGenotype(self.schema)
+        self.individuals = BinaryIndividuals(self)
+
+    ## @fn encodeGenotype(self, genotype)
+    #  @brief Return the packed row that represents genotype
+    def encodeGenotype(self, genotype):
+        bitString = ''.join( format(segment.data, '0%db' % segment.nBits) for segment in genotype.segments )
+        return np.packbits( np.array([bit == '1' for bit in bitString], dtype=np.uint8) )
+
+    ## @fn encodeRow(self, row, genotype)
+    #  @brief Store genotype in the given row
+    def encodeRow(self, row, genotype):
+        self.genes[row] = self.encodeGenotype(genotype)
+
+    ## @fn decodeRow(self, row)
+    #  @brief Return a new Genotype of BinaryChromosomeSegment objects that contains the given row
+    def decodeRow(self, row):
+        bitString = ''.join( '01'[bit] for bit in np.unpackbits(self.genes[row])[:self.nBits] )
+        return Genotype([BinaryChromosomeSegment(nBits=nBits, data=int(bitString[offset:offset+nBits] or '0', 2)) \
+                         for offset, nBits in zip(self.segmentOffsets, self.segmentBits)])
+
+    ## @fn getFitness(self, indices=None)
+    #  @brief Return the fitness of the given rows
+    def getFitness(self, indices=None):
+        if indices is None:
+            return self.fitness
+        return self.fitness[np.asarray(indices, dtype=np.intp)]
+
+    ## @fn setFitness(self, indices, fitness)
+    #  @brief Assign fitness[j] to the row indices[j]
+    def setFitness(self, indices, fitness):
+        self.fitness[np.asarray(indices, dtype=np.intp)] = fitness
+
+    ## @fn segmentData(self, rows=None)
+    #  @brief Return the integer value of every segment in the given rows
+    #  @param rows A list of row indices, every row is used if omitted
+    #  @return A (len(rows) x nSegments) matrix, of type uint64 if every segment fits in 64 bits and of python integers otherwise
+    def segmentData(self, rows=None):
+        genes = self.genes if rows is None else self.genes[np.asarray(rows, dtype=np.intp)]
+        return unpackSegmentData(genes, self.segmentBits)
+
+    ## @fn genotypeKeys(self, rows=None)
+    #  @brief Return the packed bytes of each one of the given rows, which identify their genotype
+    def genotypeKeys(self, rows=None):
+        genes = self.genes if rows is None else self.genes[np.asarray(rows, dtype=np.intp)]
+        return [row.tobytes() for row in genes]
+
+    ## @fn randomize(self)
+    #  @brief Assign a random value to every row
+    def randomize(self):
+        self.randomizeRows(np.arange(len(self.fitness)))
+
+    ## @fn randomizeRows(self, rows)
+    #  @brief Assign a random value to the given rows
+    def randomizeRows(self, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        genes = np.random.randint(0, 256, size=(len(rows), self.nBytes)).astype(np.uint8)
+        # Clear the padding bits at the end of the row
+        genes[:, -1] &= np.uint8((0xFF << (8*self.nBytes - self.nBits)) & 0xFF)
+        self.genes[rows] = genes
+
+    ## @fn crossoverRows(self, first, second)
+    #  @brief Perform a one-point crossover between the rows first[i] and second[i]
+    #  @return A matrix of packed rows, containing the bits of first[i] before the cross point and the bits of second[i] after it
+    #
+    #  Like Genotype.crossover, a segment is chosen uniformly and the cross point is chosen uniformly within its bits.
+    def crossoverRows(self, first, second):
+        first  = self.genes[np.asarray(first, dtype=np.intp)]
+        second = self.genes[np.asarray(second, dtype=np.intp)]
+        segments   = np.random.randint(0, len(self.segmentBits), size=len(first))
+        crossPoint = self.segmentOffsets[segments] + np.floor(np.random.random(len(first)) * (self.segmentBits[segments]+1)).astype(np.int64)
+        # Bytes before the cross byte come from first, bytes after it from second, and the cross byte is split by a bit mask
+        byteIndex = np.arange(self.nBytes)[None, :]
+        crossByte = (crossPoint // 8)[:, None]
+        headMask  = ((0xFF << (8 - crossPoint % 8)) & 0xFF).astype(np.uint8)[:, None]
+        mask = np.where(byteIndex < crossByte, np.uint8(0xFF), np.where(byteIndex == crossByte, headMask, np.uint8(0))).astype(np.uint8)
+        return (first & mask) | (second & ~mask)
+
+    ## @fn mutateRows(self, rows)
+    #  @brief Flip a single bit in every one of the given rows
+    #
+    #  Like Genotype.mutate, a segment is chosen uniformly and the bit is chosen uniformly within it.
+    def mutateRows(self, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        segments = np.random.randint(0, len(self.segmentBits), size=len(rows))
+        bits = self.segmentOffsets[segments] + np.floor(np.random.random(len(rows)) * self.segmentBits[segments]).astype(np.int64)
+        # Rows may be repeated, so the flips are accumulated with an unbuffered xor
+        np.bitwise_xor.at(self.genes, (rows, bits // 8), (0x80 >> (bits % 8)).astype(np.uint8))
+
+    ## @fn crossover(self, lethals, matingPool, pc=1.0)
+    #  @brief Replace the lethal rows with the offspring of the mating pool
+    #  @see Population.crossover
+    def crossover(self, lethals, matingPool, pc=1.0):
+        lethals = np.asarray(lethals, dtype=np.intp)
+        nLethals = len(lethals)
+        matingPool = np.asarray(matingPool, dtype=np.intp)
+        first, second = matingPool[0:2*nLethals:2], matingPool[1:2*nLethals:2]
+        # Offspring that are not crossed are copies of their first parent
+        offspring = self.genes[first]
+        crossed = np.flatnonzero(np.random.random(nLethals) < pc)
+        offspring[crossed] = self.crossoverRows(first[crossed], second[crossed])
+        fitness = self.fitness[first]
+        # Like Individual.clone, the offspring inherit the properties stored on the view of their first parent
+        views = self.individuals.views
+        properties = [ dict( (prop, value) for prop, value in vars(views[i]).iteritems() if prop not in ('population', 'row') ) for i in first.tolist() ]
+        # Insert the offspring in the population
+        self.genes[lethals]   = offspring
+        self.fitness[lethals] = fitness
+        for i, extra in zip(lethals.tolist(), properties):
+            view = views[i]
+            if len(vars(view)) > 2 or extra:
+                view.__dict__ = dict(population=self, row=i, **copy.deepcopy(extra))
+
+    ## @fn mutate(self, lethals, pm=0.01)
+    #  @brief Mutate each one of the lethal rows with probability pm
+    def mutate(self, lethals, pm=0.01):
+        lethals = np.asarray(lethals, dtype=np.intp)
+        self.mutateRows(lethals[np.random.random(len(lethals)) < pm])
+
+    ## @fn exportIndividuals(self, indices)
+    #  @brief Return a compact copy of the given rows, that can be sent to another process
+    #  @return A dictionary with the packed genotype rows and the fitness vector of the individuals
+    def exportIndividuals(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        return { 'genes' : self.genes[indices], 'fitness' : self.fitness[indices] }
+
+    ## @fn importIndividuals(self, indices, payload)
+    #  @brief Replace the given rows with the ones contained in a payload returned by exportIndividuals
+    def importIndividuals(self, indices, payload):
+        indices = np.asarray(indices, dtype=np.intp)
+        self.genes[indices]   = payload['genes']
+        self.fitness[indices] = payload['fitness']
+
+    ## @fn getState(self)
+    #  @brief Return a dictionary that contains the population, used by Scheduler.checkpoint
+    #
+    #  The state holds the genotype matrix and the fitness vector as they are, plus the properties stored on the individual views, if any
+    def getState(self):
+        extra = [ dict( (prop, value) for prop, value in vars(view).iteritems() if prop not in ('population', 'row') ) for view in self.individuals ]
+        return { 'properties' : dict( (prop, value) for prop, value in vars(self).iteritems() if prop != 'individuals' ),
+                 'extra'      : extra if any(extra) else None }
+
+    ## @fn setState(self, state)
+    #  @brief Restore a population returned by getState
+    def setState(self, state):
+        self.__dict__.update(state['properties'])
+        self.individuals = BinaryIndividuals(self)
+        for view, properties in zip(self.individuals, state['extra'] or []):
+            view.__dict__.update(properties)
+
+    def __deepcopy__(self, memo):
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        for prop, value in vars(self).iteritems():
+            if prop != 'individuals':
+                clone.__dict__[prop] = copy.deepcopy(value, memo)
+        clone.individuals = BinaryIndividuals(clone)
+        for view, original in zip(clone.individuals, self.individuals):
+            for prop, value in vars(original).iteritems():
+                if prop not in ('population', 'row'):
+                    view.__dict__[prop] = copy.deepcopy(value, memo)
+        return clone
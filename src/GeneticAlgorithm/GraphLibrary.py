@@ -2,68 +2,317 @@ import Core
 import EvaluationOperators
 import PlottingOperators
 
+import os
 import math
+import atexit
 import random
+import weakref
+import tempfile
 import itertools
+import collections
 import matplotlib.pyplot
+import numpy as np
+# The k-d tree of scipy is used to find nearest neighbours when it is available, a uniform grid is used otherwise
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
 
 ## @fn euclideanDistance(u, v)
 #  @brief Compute the euclidean distance between two n-dimensional points
 def euclideanDistance(u, v):
     return math.sqrt(reduce(lambda x,y: x+y, [ (u[dim]-v[dim])**2 for dim in range(len(u)) ]))
 
+## @fn euclideanDistances(U, V)
+#  @brief Compute the euclidean distances between two arrays of points at once
+#  @param U An array of points, whose last dimension holds the coordinates
+#  @param V An array of points that can be broadcast against U
+#  @return An array with the distance between every pair of broadcast points
+def euclideanDistances(U, V):
+    difference = np.asarray(U, dtype=np.float64) - np.asarray(V, dtype=np.float64)
+    return np.sqrt(np.einsum('...i,...i->...', difference, difference))
+
+## @fn twoOptMove(tour, i, j)
+#  @brief Return a copy of a tour whose nodes at positions i+1 to j are reversed, the move evaluated by Graph.twoOptDelta
+def twoOptMove(tour, i, j):
+    tour = list(tour)
+    tour[i+1:j+1] = tour[i+1:j+1][::-1]
+    return tour
+
+## @fn swapMove(tour, i, j)
+#  @brief Return a copy of a tour whose nodes at positions i and j are exchanged, the move evaluated by Graph.swapDelta
+def swapMove(tour, i, j):
+    tour = list(tour)
+    tour[i], tour[j] = tour[j], tour[i]
+    return tour
+
+## @fn insertionMove(tour, i, j)
+#  @brief Return a copy of a tour whose node at position i is moved to position j, the move evaluated by Graph.insertionDelta
+def insertionMove(tour, i, j):
+    tour = list(tour)
+    tour.insert(j, tour.pop(i))
+    return tour
+
+## @fn nearestNeighbours(V, k)
+#  @brief Find the k nearest neighbours of every point, excluding the point itself
+#  @param V An (n x d) array of point coordinates
+#  @return An (n x k) integer matrix, row i holds the neighbours of point i sorted by increasing distance
+#
+#  A scipy k-d tree is used if scipy is installed. Otherwise the points are bucketed in a uniform grid of about k/2 points per cell, and the neighbours of the points of each cell are searched in the surrounding box of cells.
+#  The box grows until the k-th neighbour of every point of the cell is closer than the border of the box, so the result is exact.
+def nearestNeighbours(V, k):
+    V = np.asarray(V, dtype=np.float64)
+    n, d = V.shape
+    k = min(k, n-1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.intp)
+    if cKDTree is not None:
+        return np.asarray(cKDTree(V).query(V, k+1)[1][:, 1:], dtype=np.intp).reshape(n, k)
+    origin = V.min(axis=0)
+    extent = np.maximum(V.max(axis=0) - origin, 1e-12)
+    side = (np.prod(extent) * max(1.0, k/2.0) / n) ** (1.0/d)
+    shape = np.maximum(1, np.ceil(extent / side).astype(np.intp))
+    cells = np.minimum(((V - origin) / side).astype(np.intp), shape-1)
+    # Bucket the points by cell
+    keys = np.ravel_multi_index(cells.T, shape)
+    order = np.argsort(keys, kind='mergesort')
+    uniqueKeys, starts = np.unique(keys[order], return_index=True)
+    buckets = dict( zip(uniqueKeys.tolist(), np.split(order, starts[1:])) )
+    neighbours = np.empty((n, k), dtype=np.intp)
+    for key, members in buckets.iteritems():
+        cell = np.array(np.unravel_index(key, shape))
+        radius = 1
+        while True:
+            low, high = np.maximum(cell-radius, 0), np.minimum(cell+radius, shape-1)
+            ranges = [xrange(l, h+1) for l, h in zip(low, high)]
+            candidates = [buckets[c] for c in (np.ravel_multi_index(c, shape) for c in itertools.product(*ranges)) if c in buckets]
+            candidates = np.concatenate(candidates)
+            distances = euclideanDistances(V[members][:, np.newaxis, :], V[candidates][np.newaxis, :, :])
+            # The point itself is excluded with an infinite distance
+            distances[members[:, np.newaxis] == candidates[np.newaxis, :]] = np.inf
+            if len(candidates) > k:
+                nearest = np.argpartition(distances, k-1, axis=1)[:, :k]
+                kth = distances[np.arange(len(members))[:, np.newaxis], nearest].max(axis=1)
+                # Distance from every point to the border of the box, borders of the grid do not count
+                lowBorder  = np.where(low  > 0,          V[members] - (origin + low*side),       np.inf)
+                highBorder = np.where(high < shape-1,    (origin + (high+1)*side) - V[members],  np.inf)
+                border = np.minimum(lowBorder, highBorder).min(axis=1)
+                if (kth <= border).all():
+                    break
+            if (low == 0).all() and (high == shape-1).all():
+                break
+            radius += 1
+        nearest = np.argsort(distances, axis=1, kind='mergesort')[:, :k]
+        neighbours[members] = candidates[nearest]
+    return neighbours
+
+## @class LazyDistanceMatrix
+#  @brief A read-only N x N matrix of euclidean distances between node coordinates, whose elements are computed only when they are indexed
+#
+#  The matrix supports the same indexing as a numpy array: W[i][j], W[i, j], W[i] (a whole row) and fancy indexing W[rows, cols], so graphs with 100k nodes can be used without storing N^2 distances.
+class LazyDistanceMatrix(object):
+    ## @fn __init__(self, V, dtype=np.float64)
+    #  @param V The node coordinates
+    #  @param dtype The type of the returned distances
+    def __init__(self, V, dtype=np.float64):
+        self.V = np.asarray(V, dtype=np.float64)
+        self.dtype = np.dtype(dtype)
+        self.shape = (len(self.V), len(self.V))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            rows, cols = index
+            return euclideanDistances(self.V[rows], self.V[cols]).astype(self.dtype)
+        return euclideanDistances(self.V[index][..., np.newaxis, :], self.V).astype(self.dtype)
+
+    def __iter__(self):
+        for j in xrange(len(self)):
+            yield self[j]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[np.arange(len(self))], dtype=dtype)
+
+## @var blockElements
+#  @brief The number of coordinate differences computed at once by Graph.updateW, which bounds its temporary memory
+blockElements = 1<<22
+
+## @var temporaryFiles
+#  @brief The temporary weight matrix files created by Graph.updateW, mapped to a weak reference to their graph
+#
+#  A graph may be part of a reference cycle (e.g. with the operators that use it), so its files are not removed by a __del__ method, which would make the cycle uncollectable in Python 2.
+#  The weak reference removes the file when the graph is collected, and the files of the graphs still alive are removed at exit.
+temporaryFiles = {}
+
+## @fn removeTemporaryPath(path, pid=None)
+#  @brief Remove a temporary weight matrix file and forget it
+#  @param pid The process that created the file, the file is kept if it is called from another process (e.g. a forked worker)
+def removeTemporaryPath(path, pid=None):
+    if pid is not None and pid != os.getpid():
+        return
+    temporaryFiles.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+## @fn removeTemporaryFiles()
+#  @brief Remove every temporary weight matrix file created by this process, registered with atexit
+def removeTemporaryFiles():
+    for path in temporaryFiles.keys():
+        removeTemporaryPath(path)
+
+atexit.register(removeTemporaryFiles)
+
 ## @class Graph
 #  @brief This class 
+#
+#  The weight matrix W is a numpy array. For large instances, the storage parameter selects how the euclidean distances are kept:
+#  <ul>
+#    <li>'memory': An N x N array of type dtype (the default)</li>
+#    <li>'memmap': An N x N numpy.memmap of type dtype, stored in the file path (a temporary file if path is omitted)</li>
+#    <li>'lazy': A LazyDistanceMatrix, which computes the distances when they are indexed and only stores the node coordinates</li>
+#  </ul>
 class Graph(Core.GABaseObject):
     ## @fn __init__(V,E,W,N,**kwargs)
     #  @brief This class models a weighted, directed graph.
     #  @param V A list of of node coordinates, if it is not provided, a random set of coordinates will be produced
     #  @param W A matrix (or list of lists) that contains the edge costs, if not provided, the graph will compute the euclidean distance between nodes
     #  @param N if both V and W are omitted, 
+    #  @param dtype The type of the computed weight matrix, numpy.float64 or numpy.float32
+    #  @param storage How the computed weight matrix is stored: 'memory', 'memmap' or 'lazy'
+    #  @param path The file of the weight matrix when storage is 'memmap'
     #  
     #  W must be of size len(V) x len(V) to contain the weights of the graph edge; W[j][i] -> is the cost of going from j to i, nonexisting edges should be represented using the None object; If this parameter is not 
-    def __init__(self, V=None, W=[], N=5, **kwargs):
+    def __init__(self, V=None, W=None, N=5, dtype=np.float64, storage='memory', path=None, **kwargs):
+        if storage not in ('memory', 'memmap', 'lazy'):
+            raise ValueError('Unknown weight matrix storage %r' % storage)
+        self.dtype   = dtype
+        self.storage = storage
+        self.path    = path
+        ## @property ownsPath True if path is a temporary file created by updateW, which is removed by close
+        self.ownsPath = False
         # Get V from arguments or generate a random set of coordinates
-        if V:
+        if V is not None and len(V):
             self.V = V;
         else:            
             self.randomizeNodePositions(N)
             
         # Get W from arguments or compute the euclidean distance between node coordinates 
-        if W:
+        if W is not None and len(W):
             self.W = W
-        else:
+        elif V is not None and len(V):
             self.updateW()
         # Run teh superclass constructor for the rest of the arguments    
         super(Graph, self).__init__(**kwargs)
     
     ## @fn updateW(self)
     #  @brief Update the weight matrix to be consistent with the current node positions
+    #
+    #  The distances are computed in blocks of rows, so that the temporary arrays never hold more than blockElements coordinate differences
     def updateW(self):
-        N = len(self.V)
-        # Create a list N of lists of size N
-        self.W = [ [0 for i in range(N)] for j in range(N) ]
-        # Loop over origin nodes
-        for j in range(N):
-            # Loop over destinations
-            for i in range(j, N):
-                # Compute the distance
-                d = euclideanDistance(self.V[j], self.V[i])
-                # This part assumes that edges are symmetrical, i.e. w[i,j] = w[j,i] 
-                self.W[j][i] = d
-                self.W[i][j] = d
+        V = np.asarray(self.V, dtype=np.float64)
+        N = len(V)
+        if self.storage == 'lazy':
+            self.W = LazyDistanceMatrix(V, self.dtype)
+            return
+        if self.storage == 'memmap':
+            if self.path is None:
+                descriptor, self.path = tempfile.mkstemp(suffix='.W')
+                os.close(descriptor)
+                self.ownsPath = True
+                temporaryFiles[self.path] = weakref.ref(self, lambda reference, path=self.path, pid=os.getpid(): removeTemporaryPath(path, pid))
+            W = np.memmap(self.path, dtype=self.dtype, mode='w+', shape=(N, N))
+        else:
+            W = np.empty((N, N), dtype=self.dtype)
+        rows = max(1, blockElements // max(1, N * V.shape[1]))
+        for j in xrange(0, N, rows):
+            W[j:j+rows] = euclideanDistances(V[j:j+rows, np.newaxis, :], V[np.newaxis, :, :])
+        if self.storage == 'memmap':
+            W.flush()
+        self.W = W
     
     ## @fn pathLength(self, path)
     #  @brief Compute the length of a path
     #  @param path An iterable that returns the nodes in the desired path
     def pathLength(self, path):
-        length  = 0.0
-        pivot = path[0]
-        for vertex in path[1:]:
-            length += self.W[pivot][vertex]
-            pivot = vertex
-        return length
+        path = np.asarray(path, dtype=np.intp)
+        return float(np.sum(self.W[path[:-1], path[1:]], dtype=np.float64))
+
+    ## @fn pathLengths(self, paths)
+    #  @brief Compute the length of several paths with the same number of nodes at once
+    #  @param paths A matrix whose rows are the paths
+    #  @return A vector with the length of every path
+    def pathLengths(self, paths):
+        paths = np.asarray(paths, dtype=np.intp)
+        return np.sum(self.W[paths[:, :-1], paths[:, 1:]], axis=1, dtype=np.float64)
     
+    ## @fn nearestNeighbours(self, k)
+    #  @brief Return the k nearest neighbours of every node according to the node coordinates V, see nearestNeighbours
+    def nearestNeighbours(self, k):
+        return nearestNeighbours(self.V, k)
+
+    ## @fn tourLengths(self, tours)
+    #  @brief Compute the length of several closed tours at once, with a single gather and sum over the weight matrix
+    #  @param tours A (batch x n) matrix whose rows are permutations of the nodes, the edge from the last node back to the first one is included
+    #  @return A vector with the length of every tour
+    def tourLengths(self, tours):
+        tours = np.asarray(tours, dtype=np.intp)
+        return np.sum(self.W[tours, np.roll(tours, -1, axis=1)], axis=1, dtype=np.float64)
+
+    ## @fn twoOptDelta(self, tour, i, j)
+    #  @brief Return the change of length of a closed tour when the nodes at positions i+1 to j are reversed, in O(1)
+    #  @param tour The tour, as a numpy array (or a list, if i and j are integers)
+    #  @param i The position before the reversed section, 0 <= i < j
+    #  @param j The last position of the reversed section, j < len(tour)
+    #
+    #  Only the edges (tour[i], tour[i+1]) and (tour[j], tour[j+1]) change, which assumes a symmetric weight matrix.
+    #  i and j may be arrays of candidate moves, in which case a vector of deltas is returned. See twoOptMove.
+    def twoOptDelta(self, tour, i, j):
+        W, n = self.W, len(tour)
+        a, b, c, d = tour[i], tour[(i+1) % n], tour[j], tour[(j+1) % n]
+        return W[a, c] + W[b, d] - W[a, b] - W[c, d]
+
+    ## @fn swapDelta(self, tour, i, j)
+    #  @brief Return the change of length of a closed tour when the nodes at positions i and j are exchanged, in O(1)
+    #  @param tour The tour, as a numpy array (or a list, if i and j are integers)
+    #  @param i The position of the first node, 0 <= i < j
+    #  @param j The position of the second node, j < len(tour)
+    #
+    #  The edges that start at positions i-1, i, j-1 and j are replaced; when the nodes are adjacent, the edge between them is only counted once.
+    #  i and j may be arrays of candidate moves, in which case a vector of deltas is returned. See swapMove.
+    def swapDelta(self, tour, i, j):
+        W, n = self.W, len(tour)
+        u, v = tour[i], tour[j]
+        # The node at position k after the swap
+        swapped = lambda k: np.where(k == i, v, np.where(k == j, u, tour[k]))
+        delta = 0.0
+        for start, counted in ( (i-1, True), (i, True), (j-1, j-1 != i), (j, (j+1) % n != i) ):
+            start, end = start % n, (start+1) % n
+            delta = delta + counted * (W[swapped(start), swapped(end)] - W[tour[start], tour[end]])
+        return delta
+
+    ## @fn insertionDelta(self, tour, i, j)
+    #  @brief Return the change of length of a closed tour when the node at position i is removed and inserted back so that it ends at position j, in O(1)
+    #  @param tour The tour, as a numpy array (or a list, if i and j are integers)
+    #  @param i The position of the moved node
+    #  @param j The position of the moved node after the move, 0 <= j < len(tour)
+    #
+    #  The node is removed from between its neighbours, and inserted between the nodes at positions j and j+1 if j > i, or j-1 and j if j < i (skipping the node itself around the end of the tour).
+    #  i and j may be arrays of candidate moves, in which case a vector of deltas is returned. See insertionMove.
+    def insertionDelta(self, tour, i, j):
+        W, n = self.W, len(tour)
+        node, previous, following = tour[i], tour[(i-1) % n], tour[(i+1) % n]
+        # The positions of the nodes that surround the node after the move
+        before = np.where(j > i, j, j-1) % n
+        after  = np.where(j > i, j+1, j) % n
+        before = np.where(before == i, (before-1) % n, before)
+        after  = np.where(after == i, (after+1) % n, after)
+        x, y = tour[before], tour[after]
+        return np.where(j == i, 0.0, W[x, node] + W[node, y] - W[x, y] + W[previous, following] - W[previous, node] - W[node, following])
+
     ## @fn __str__(self)
     #  @brief  A human readable representation of the graph
     #  @return Return a multi-line string representation of the graph
@@ -76,14 +325,54 @@ class Graph(Core.GABaseObject):
     #  @brief Validate that the attributes V and W are consistent
     def __setattr__(self, attribute, value):
         if attribute=='V':
-            value = list(value)
+            value = [tuple(v) for v in value]
         elif attribute=='W':
+            if not hasattr(value, 'shape'):
+                value = np.array(value, dtype=np.float64)
             n = len(self.V)
-            if not all(len(row)==n for row in value):
-                raise IndexError('Every row in the weight matrix (W) must have size %d' % n)
-            elif not len(value)==n:
-                raise IndexError('Weight matrix must be of size %d' % n)
+            if not tuple(value.shape)==(n, n):
+                raise IndexError('Weight matrix must be of size %d x %d' % (n, n))
         super(Graph, self).__setattr__(attribute, value)
+        # A temporary weight matrix file is removed as soon as the matrix is replaced by one that does not use it
+        if attribute=='W' and getattr(self, 'ownsPath', False) and \
+           not (isinstance(value, np.memmap) and os.path.abspath(value.filename) == os.path.abspath(self.path)):
+            self.removeTemporaryFile()
+
+    ## @fn removeTemporaryFile(self)
+    #  @brief Remove the weight matrix file created by updateW, if any
+    def removeTemporaryFile(self):
+        if getattr(self, 'ownsPath', False):
+            self.ownsPath = False
+            removeTemporaryPath(self.path)
+            self.path = None
+
+    ## @fn close(self)
+    #  @brief Release the weight matrix, and remove its file if it is a temporary file created by updateW
+    #
+    #  Otherwise the file is removed when the graph is garbage collected, or when the interpreter exits (see temporaryFiles).
+    def close(self):
+        if 'W' in vars(self):
+            del self.W
+        self.removeTemporaryFile()
+
+    ## @fn __getstate__(self)
+    #  @brief Pickle a memory-mapped graph by the path of its weight matrix, so that worker processes map the same file instead of receiving a copy
+    #
+    #  The copies never own the file, only the original graph removes it.
+    def __getstate__(self):
+        state = dict(vars(self))
+        if isinstance(self.W, np.memmap):
+            state['W'] = None
+        state['ownsPath'] = False
+        return state
+
+    ## @fn __setstate__(self, state)
+    #  @brief Restore a pickled graph, mapping the weight matrix file read-only if it was memory-mapped
+    def __setstate__(self, state):
+        if 'W' in state and state['W'] is None:
+            n = len(state['V'])
+            state['W'] = np.memmap(state['path'], dtype=state['dtype'], mode='r', shape=(n, n))
+        self.__dict__.update(state)
     
     ## @fn randomize(self, n=None)
     #  @brief Randomize the node positions and modify V
@@ -111,6 +400,63 @@ class Graph(Core.GABaseObject):
         vx, vy = zip( *self.V )
         axes.plot(vx, vy, 'ro')
 
+## @var fenwickThreshold
+#  @brief The number of nodes from which ordonezPlace uses the O(n log n) Fenwick tree algorithm
+#
+#  Below this size, inserting in a python list is faster in practice: each insertion is a single memmove, while the tree costs O(log n) interpreted operations per node.
+fenwickThreshold = 50000
+
+## @fn ordonezPlace(positions)
+#  @brief Build the permutation of the numbers 0:n that results from starting with [0] and inserting node j+1 at positions[j], for every j
+#
+#  For long permutations, the insertions are replayed backwards: the position of the last inserted node is final, and every earlier node takes the free final slot whose rank among the free slots is its insertion position.
+#  The free slots are kept in a Fenwick tree, so finding and taking the slot of each node costs O(log n), and the whole permutation O(n log n).
+def ordonezPlace(positions):
+    n = len(positions) + 1
+    if n < fenwickThreshold:
+        perm = [0]
+        for j, position in enumerate(positions):
+            perm.insert(position, j+1)
+        return perm
+    # With every slot free, each node of the Fenwick tree counts its lowest set bit slots
+    tree = [0] + [i & -i for i in xrange(1, n+1)]
+    top = 1 << (n.bit_length() - 1)
+    # Node 0 is never inserted, it keeps the only slot left at the end
+    perm = [0] * n
+    for j in xrange(n-2, -1, -1):
+        # Find the free slot of rank positions[j], descending the tree
+        rank, pos, step = positions[j] + 1, 0, top
+        while step:
+            if pos + step <= n and tree[pos + step] < rank:
+                pos += step
+                rank -= tree[pos]
+            step >>= 1
+        perm[pos] = j+1
+        # Take the slot
+        i = pos + 1
+        while i <= n:
+            tree[i] -= 1
+            i += i & -i
+    return perm
+
+## @fn ordonezDecode(values)
+#  @brief Decode the values of an Ordonez genotype as a permutation of the numbers 0:n, where n is the number of values
+#
+#  The node j+1 is inserted at position values[j] % (j+2), see ordonezPlace.
+def ordonezDecode(values):
+    return ordonezPlace([value % (j+2) for j, value in enumerate(values)])
+
+## @fn ordonezDecodeBatch(values)
+#  @brief Decode a matrix of Ordonez genotypes at once, each row as in ordonezDecode
+#  @param values An integer matrix with one genotype per row, e.g. the segmentData of a population
+#  @return The list of permutations
+#
+#  The insertion positions of every row are computed with a single numpy operation.
+def ordonezDecodeBatch(values):
+    values = np.asarray(values, dtype=np.uint64)
+    positions = values % np.arange(2, values.shape[1]+2, dtype=np.uint64)
+    return [ordonezPlace(row) for row in positions.tolist()]
+
 ## @class Ordonez(Core.GeneticOperator)
 #  @brief A GeneticAlgorithm::Core::GeneticOperator derivate that decodes a binary genotype as a permutation of the numbers 0:n, where n is the number of segments in the genotype 
 class Ordonez(EvaluationOperators.BaseEvaluationOperator):    
@@ -126,31 +472,186 @@ class Ordonez(EvaluationOperators.BaseEvaluationOperator):
     #            <li>Insert the j+1 thn node in the position computed above</li>
     #            </ol> </li>
     #
-    #  This algorithm guarantees valid hamiltonian cycles over a completely-connected graph. 
+    #  This algorithm guarantees valid hamiltonian cycles over a completely-connected graph. Long permutations are built in O(n log n), see ordonezPlace.
     def evaluateIndividual(self, individual):
-        # All permutations start with 0         
-        perm = [0];
-        geno = [segment.data for segment in individual.genotype.segments]
-        for j in range(len(geno)):                
-            position = geno[j] % (j+2)
-            perm.insert(position, j+1)
-            
-        individual.phenotype = perm;
+        individual.phenotype = ordonezDecode([segment.data for segment in individual.genotype.segments])
+
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Decode the segment data matrix of every lethal with ordonezDecodeBatch, the fitness is left unchanged
+    def evaluateBatch(self, population, lethals):
+        for i, perm in zip(lethals, ordonezDecodeBatch(population.segmentData(lethals))):
+            population.individuals[i].phenotype = perm
+        return population.getFitness(lethals)
 
 ## @class PathLengthFitness(Core.GeneticOperator)
 #  @brief A GeneticAlgorithm::Core::GeneticOperator derivate that uses  
+#
+#  The tour of an individual is its phenotype (e.g. decoded by Ordonez), or, if useGenotype is set, the data of its first genotype segment (e.g. a GenotypeLibrary.PermutationChromosomeSegment), which needs no decoding stage.
 class PathLengthFitness(EvaluationOperators.BaseEvaluationOperator):
-    def __init__(self, graph=None, **kwargs):
+    def __init__(self, graph=None, useGenotype=False, **kwargs):
         super(PathLengthFitness, self).__init__(**kwargs)
         if graph==None:
             graph = Graph()
         self.graph = graph
+        self.useGenotype = useGenotype
+
+    ## @fn tour(self, individual)
+    #  @brief Return the tour of an individual, from its phenotype or its genotype according to useGenotype
+    def tour(self, individual):
+        return individual.genotype.segments[0].data if self.useGenotype else individual.phenotype
     
     # @fn evaluateIndividual(self, individual)
     # @brief Use the graph's weight matrix to compute the length of the path contained in the individual's phenotype
     def evaluateIndividual(self, individual):
-        path = individual.phenotype + individual.phenotype[0:1]
-        individual.fitness = self.graph.pathLength(path)
+        individual.fitness = float(self.graph.tourLengths([self.tour(individual)])[0])
+
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Compute the length of the closed tours of every lethal with a single fancy indexing of the weight matrix
+    def evaluateBatch(self, population, lethals):
+        if self.useGenotype:
+            tours = [data[0] for data in population.segmentData(lethals)]
+        else:
+            tours = [population.individuals[i].phenotype for i in lethals]
+        return self.graph.tourLengths(np.array(tours, dtype=np.intp)).tolist()
+
+## @class LocalSearch
+#  @brief An evaluation operator that improves the tours of the lethal individuals with 2-opt and Or-opt moves, turning the GA into a memetic algorithm
+#
+#  The operator must come after the fitness evaluation. Moves are only tried towards the k nearest neighbours of each node (computed once from Graph.V, see nearestNeighbours), and every node has a don't-look bit:
+#  only the nodes of a queue are examined, and a node re-enters the queue when one of its edges changes, so each improvement pass is near-linear in the number of nodes.
+#  <ul>
+#    <li>2-opt: Replace the edges (a, b) and (c, d) with (a, c) and (b, d), where c is a neighbour of a closer than b</li>
+#    <li>Or-opt: Move a section of up to maxSegment nodes that starts at a next to one of the neighbours of a, in either orientation</li>
+#  </ul>
+#  If useGenotype is set, the improved tour replaces the permutation in the first genotype segment (Lamarckian learning, e.g. with GenotypeLibrary.PermutationChromosomeSegment).
+#  Otherwise the improved tour replaces the phenotype and only the fitness is inherited (Baldwinian learning, e.g. after Ordonez).
+#  The weight matrix is expected to be symmetric.
+class LocalSearch(EvaluationOperators.BaseEvaluationOperator):
+    ## @fn __init__(self, graph=None, neighbours=8, moves=('2opt', 'oropt'), maxSegment=3, useGenotype=False, **kwargs)
+    #  @brief The operator constructor
+    #  @param graph The graph of the tours
+    #  @param neighbours The length of the candidate list of every node
+    #  @param moves The moves to try, '2opt' and/or 'oropt'
+    #  @param maxSegment The longest section moved by Or-opt
+    #  @param useGenotype Read and write the tour in the first genotype segment instead of the phenotype
+    def __init__(self, graph=None, neighbours=8, moves=('2opt', 'oropt'), maxSegment=3, useGenotype=False, **kwargs):
+        super(LocalSearch, self).__init__(**kwargs)
+        if graph==None:
+            graph = Graph()
+        self.graph = graph
+        self.neighbours = neighbours
+        self.moves = moves
+        self.maxSegment = maxSegment
+        self.useGenotype = useGenotype
+        ## @property candidates The candidate list of every node, computed on first use
+        self.candidates = None
+
+    ## @fn evaluateIndividual(self, individual)
+    #  @brief Improve the tour of an individual, and set its fitness to the length of the improved tour
+    def evaluateIndividual(self, individual):
+        if self.useGenotype:
+            segment = individual.genotype.segments[0]
+            segment.data = self.improve(segment.data)
+            tour = segment.data
+        else:
+            tour = individual.phenotype = self.improve(individual.phenotype)
+        individual.fitness = float(self.graph.tourLengths([tour])[0])
+
+    ## @fn improve(self, tour)
+    #  @brief Apply improving moves to a closed tour until none of the candidate moves improves it
+    #  @return The improved tour, as a list
+    def improve(self, tour):
+        if self.candidates is None:
+            self.candidates = self.graph.nearestNeighbours(self.neighbours).tolist()
+        candidates = self.candidates
+        W = self.graph.W
+        distance = W.item if hasattr(W, 'item') else (lambda a, b: float(W[a, b]))
+        tour = [int(node) for node in tour]
+        n = len(tour)
+        if n < 5:
+            return tour
+        position = [0] * n
+        for i, node in enumerate(tour):
+            position[node] = i
+        following = lambda node: tour[(position[node]+1) % n]
+        preceding = lambda node: tour[position[node]-1]
+        epsilon = 1e-12
+
+        ## Reverse the section of the tour that goes from node first to node last, or the rest of the tour, whichever is shorter
+        def reverse(first, last):
+            i, j = position[first], position[last]
+            length = (j - i) % n + 1
+            if 2*length > n:
+                i, j, length = (j+1) % n, (i-1) % n, n - length
+            for step in xrange(length // 2):
+                a, b = (i+step) % n, (j-step) % n
+                tour[a], tour[b] = tour[b], tour[a]
+                position[tour[a]], position[tour[b]] = a, b
+
+        ## Replace the edges {u1, u2} and {v1, v2} with {u1, v1} and {u2, v2}, where u2 follows u1 in the same direction as v2 follows v1
+        def exchange(u1, u2, v1, v2):
+            if following(u1) == u2:
+                reverse(u2, v1)
+            else:
+                reverse(u1, v2)
+
+        ## Try the 2-opt moves that connect node a to one of its candidates, return the nodes whose edges changed
+        def twoOpt(a):
+            for successor in (True, False):
+                b = following(a) if successor else preceding(a)
+                ab = distance(a, b)
+                for c in candidates[a]:
+                    ac = distance(a, c)
+                    if ac >= ab:
+                        break
+                    d = following(c) if successor else preceding(c)
+                    if ac + distance(b, d) - ab - distance(c, d) < -epsilon:
+                        exchange(a, b, c, d)
+                        return (a, b, c, d)
+            return None
+
+        ## Try to move the sections that start at node a next to one of its candidates, return the nodes whose edges changed
+        def orOpt(a):
+            for length in xrange(1, min(self.maxSegment, n-3) + 1):
+                start = position[a]
+                e = tour[(start+length-1) % n]
+                p, q = preceding(a), following(e)
+                gain = distance(p, a) + distance(e, q) - distance(p, q)
+                for c in candidates[a]:
+                    ca = distance(c, a)
+                    if ca >= gain:
+                        break
+                    if (position[c] - start) % n < length:
+                        continue
+                    # Either c, a..e, following(c) or preceding(c), e..a, c
+                    for after in (True, False):
+                        d = following(c) if after else preceding(c)
+                        if (position[d] - start) % n < length or (after and c == p) or (not after and c == q):
+                            continue
+                        if ca + distance(e, d) - distance(c, d) - gain < -epsilon:
+                            # The move is made of two or three edge exchanges, which only reverse the shortest sides of the tour
+                            if after:
+                                exchange(p, a, c, d)
+                                exchange(p, c, q, e)
+                                exchange(c, e, a, d)
+                            else:
+                                exchange(p, a, d, c)
+                                exchange(p, d, q, e)
+                            return (p, q, a, e, c, d)
+            return None
+
+        queue = collections.deque(tour)
+        queued = [True] * n
+        while queue:
+            a = queue.popleft()
+            queued[a] = False
+            changed = ('2opt' in self.moves and twoOpt(a)) or ('oropt' in self.moves and orOpt(a))
+            if changed:
+                for node in changed:
+                    if not queued[node]:
+                        queued[node] = True
+                        queue.append(node)
+        return tour
 
 ## @todo Make a node matching decoding, evaluation and logger/plotter
 ## @todo Make an edge/node covering decoding, evaluation and logger/plotter
@@ -159,6 +660,7 @@ class PathLengthFitness(EvaluationOperators.BaseEvaluationOperator):
 ## @class BestPathPlotLogger
 #  @brief This class extends the PlottingOperators::PlotBestLogger to display the best tour found so far.
 class BestPathPlotLogger(PlottingOperators.PlotBestLogger):
+    transientProperties = PlottingOperators.PlotBestLogger.transientProperties + ('graphAxis',)
     ## @fn __init__(self, graph=None, criterionAxis=None, graphAxis=None, figure=None, **kwargs):
     #  @brief The genetic operator constructor
     #  @param graph The graph used to plot paths
@@ -182,7 +684,9 @@ class BestPathPlotLogger(PlottingOperators.PlotBestLogger):
     #  @param population The current population where a new best is searched for 
     def plotGraphCallback(self, population):
         if len(self.bestLog) >= 1:
-            path = (self.bestLog[-1].phenotype[i] for i in range(len(self.graph.V)) + [0] )
+            best = self.bestLog[-1]
+            tour = best.phenotype if hasattr(best, 'phenotype') else best.genotype.segments[0].data
+            path = (tour[i] for i in range(len(self.graph.V)) + [0] )
             self.graphAxis.cla()
             self.graph.plot(axes=self.graphAxis, paths=[path])
         super(BestPathPlotLogger, self).plotCallback(population)        
@@ -0,0 +1,168 @@
+import Core
+import EvaluationOperators
+
+import numpy as np
+
+## @class Knapsack
+#  @brief An evaluation operator that computes the relaxed version of the objective function used to solve a knapsack instance.
+#
+#  This class implements the following evaluation function:
+#   \f{eqnarray*}{
+#        \max \limits_{\textbf{s}} z =& \textbf{c}^{\textrm{T}}\textbf{s} + f_{\lambda}(\textbf{v}, \textbf{s}) \\
+#        f_{\lambda}(\textbf{v}, \textbf{s}) =&
+#               \left\{
+#                 \begin{array}{rl}
+#                   \lambda (V_{\textrm{max}} - \textbf{v}^{\textrm{T}}\textbf{s}) & \textrm{ if }  \textbf{v}^{\textrm{T}}\textbf{s} \geq V_{\textrm{max}}\\
+#                   0 &  \textrm{otherwise}
+#                 \end{array}
+#               \right. \\
+#   \f}
+#
+#  The parameter \f$ \textbf{c} \f$ is the cost vector. Element \f$ c_{i} \f$ is the gain from taking object \f$i\f$.
+#  The parameter \f$ \textbf{v} \f$ is the volume vector. Element \f$ v_{i} \f$ is the volume consumed when taking object \f$i\f$.
+#  The parameter \f$ \textbf{s} \f$ is the solution. Each decision variable \f$ s_{i}\f$ is binary, and takes the value 1 if the object \f$i\f$ is selected to be part of the solution and 0 otherwise.
+#  The parameter \f$ V_{\textrm{max}} \f$ is the maximum volume allowed for a solution. The parameter \f$ \lambda \f$ is a penalization factor, used to penalize all the unfeasible individuals.
+#
+#  The genotype holds one single-bit segment per object. The whole lethal set is evaluated at once: its solutions form a bit matrix \f$ S \f$, and the costs and volumes are the products \f$ S\textbf{c} \f$ and \f$ S\textbf{v} \f$.
+#  Every evaluated individual keeps its cost and volume in the cost and volume properties, together with the genotype key (see Population.genotypeKeys) they were computed for in the knapsackKey property.
+#  The totals are only trusted while the key matches the current genotype, so individuals changed by crossover, copied from another individual or evaluated elsewhere (e.g. by a CachedEvaluation hit or a ParallelEvaluation worker) are evaluated from scratch.
+#  Individuals whose totals are current are not evaluated again, and flip can change some objects of their solution and update their fitness in O(1) per object. KnapsackMutate uses flip to mutate the population.
+class Knapsack(EvaluationOperators.BaseEvaluationOperator):
+    ## @fn __init__(self, maxVolume=0, objectVolumes=[], volumeLambda=0.0, objectCosts=[], **kwargs)
+    #  @brief Initialize an evaluation operator to implement the evaluation function as described above
+    #  @param maxVolume The maximum volume allowed for feasible solutions \f$ V_{\textrm{max}} \f$
+    #  @param objectVolumes The vector of object volumes \f$ \textbf{v} \f$
+    #  @param objectCosts The vector of object costs \f$ \textbf{c} \f$
+    #  @param volumeLambda The penalization factor \f$ \lambda \f$
+    def __init__(self, maxVolume=0, objectVolumes=[], volumeLambda=0.0, objectCosts=[], **kwargs):
+        super(Knapsack, self).__init__(**kwargs)
+        ## @member maxVolume The maximum volume allowed for feasible solutions \f$ V_{\textrm{max}} \f$
+        self.maxVolume = maxVolume
+        ## @member objectVolumes The vector of object volumes \f$ \textbf{v} \f$
+        self.objectVolumes = np.asarray(objectVolumes)
+        ## @member objectCosts The vector of object costs \f$ \textbf{c} \f$
+        self.objectCosts = np.asarray(objectCosts)
+        ## @member volumeLambda The penalization factor \f$ \lambda \f$
+        self.volumeLambda = volumeLambda
+
+    ## @fn solutions(self, population, rows)
+    #  @brief Return the solution vectors of the given individuals as a (len(rows) x nObjects) uint8 matrix
+    #
+    #  The bits of a GenotypeLibrary.BinaryPopulation are unpacked directly from its genotype matrix, other populations are read through segmentData
+    def solutions(self, population, rows):
+        genes = getattr(population, 'genes', None)
+        if genes is not None and population.nBits == len(population.segmentBits):
+            return np.unpackbits(genes[np.asarray(rows, dtype=np.intp)], axis=1)[:, :population.nBits]
+        return np.asarray(population.segmentData(rows), dtype=np.uint8).reshape(len(rows), -1)
+
+    ## @fn totals(self, solutions)
+    #  @brief Return the cost and volume vectors of a matrix of solutions
+    def totals(self, solutions):
+        return solutions.dot(self.objectCosts), solutions.dot(self.objectVolumes)
+
+    ## @fn fitness(self, cost, volume)
+    #  @brief Return the relaxed objective of solutions with the given costs and volumes
+    def fitness(self, cost, volume):
+        # The difference between the maximum allowed volume and the solution volume is the residual volume
+        residualVolume = self.maxVolume - np.asarray(volume)
+        # If the residual volume is greater than 0, the solution is not penalized. The solution is penalized with a cost of lambda*residualVolume otherwise
+        return cost + np.where(residualVolume > 0, 0, self.volumeLambda*residualVolume)
+
+    ## @fn evaluateIndividual(self, individual)
+    #  @brief Evaluate an individual according to the function described above
+    #  @param individual The list [segment.data for segment in individual.genotype.segments] contains the solution vector \f$ \textbf{s} \f$
+    def evaluateIndividual(self, individual):
+        solution = np.array([segment.data for segment in individual.genotype.segments], dtype=np.uint8)
+        cost, volume = self.totals(solution)
+        individual.cost, individual.volume = cost.item(), volume.item()
+        individual.fitness = self.fitness(cost, volume).item()
+
+    ## @fn hasTotals(self, population, index, key=None)
+    #  @brief Return True if the cost and volume properties of an individual were computed for its current genotype
+    #  @param key The genotype key of the individual, computed with population.genotypeKeys if omitted
+    def hasTotals(self, population, index, key=None):
+        if key is None:
+            key = population.genotypeKeys([index])[0]
+        return getattr(population.individuals[index], 'knapsackKey', None) == key
+
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Evaluate the lethals whose totals are not current with two matrix-vector products over their solution bit matrix
+    def evaluateBatch(self, population, lethals):
+        keys = population.genotypeKeys(lethals)
+        individuals = [population.individuals[i] for i in lethals]
+        stale = [j for j, (individual, key) in enumerate(zip(individuals, keys)) if getattr(individual, 'knapsackKey', None) != key]
+        if stale:
+            cost, volume = self.totals(self.solutions(population, [lethals[j] for j in stale]))
+            for j, c, v in zip(stale, cost.tolist(), volume.tolist()):
+                individual = individuals[j]
+                individual.cost, individual.volume, individual.knapsackKey = c, v, keys[j]
+        return self.fitness(np.array([individual.cost for individual in individuals]), np.array([individual.volume for individual in individuals])).tolist()
+
+    ## @fn flipBits(self, population, index, objects)
+    #  @brief Flip the given objects in or out of the solution of an individual, without updating its totals
+    #  @param objects A numpy vector of distinct object indices
+    #  @return A boolean vector, True for the objects that were taken before the flip
+    def flipBits(self, population, index, objects):
+        genes = getattr(population, 'genes', None)
+        if genes is not None:
+            offsets = population.segmentOffsets[objects]
+            masks = np.left_shift(1, 7 - offsets % 8).astype(np.uint8)
+            before = (genes[index, offsets // 8] & masks) != 0
+            np.bitwise_xor.at(genes[index], offsets // 8, masks)
+            return before
+        segments = population.individuals[index].genotype.segments
+        before = np.array([segments[j].data for j in objects.tolist()], dtype=bool)
+        for j in objects.tolist():
+            segments[j].data ^= 1
+        return before
+
+    ## @fn flip(self, population, index, objects)
+    #  @brief Flip the given objects in or out of the solution of an evaluated individual, and update its cost, volume and fitness
+    #  @param index The index of the individual in the population
+    #  @param objects A list of object indices, an object listed several times is flipped once
+    #
+    #  Only the contributions of the flipped objects are added or removed, so each flip costs O(1) instead of a new O(nObjects) evaluation.
+    #  A ValueError is raised if the totals of the individual are missing or were computed for another genotype (see hasTotals).
+    def flip(self, population, index, objects):
+        if not self.hasTotals(population, index):
+            raise ValueError('Individual %d has no knapsack totals for its current genotype, it must be evaluated by this operator before flip' % index)
+        objects = np.unique(np.asarray(objects, dtype=np.intp))
+        # Objects that were taken are removed, and the others are added
+        sign = np.where(self.flipBits(population, index, objects), -1, 1)
+        individual = population.individuals[index]
+        individual.cost   = individual.cost   + (sign * self.objectCosts[objects]).sum().item()
+        individual.volume = individual.volume + (sign * self.objectVolumes[objects]).sum().item()
+        individual.knapsackKey = population.genotypeKeys([index])[0]
+        population.setFitness([index], [self.fitness(individual.cost, individual.volume).item()])
+
+## @class KnapsackMutate
+#  @brief A mutation operator that flips a random object of each mutated individual through Knapsack.flip
+#
+#  Like Core.Mutate, each lethal is mutated with probability population.mutation_probability, and a single object (the single bit of a random segment) is flipped.
+#  The fitness of the mutated individuals whose totals are current is updated in O(1), so the evaluation operator does not evaluate them again. The other individuals (e.g. the offspring of a crossover) are only flipped, and evaluated as usual.
+#  @code
+#    knapsack = KnapsackLibrary.Knapsack(maxVolume, objectVolumes, volumeLambda, objectCosts)
+#    operators = [knapsack, SelectionOperators.KTournament(), SelectionOperators.SelectLethals(), Core.Crossover(), KnapsackLibrary.KnapsackMutate(knapsack=knapsack)]
+#  @endcode
+class KnapsackMutate(Core.Mutate):
+    ## @fn __init__(self, knapsack=None, **kwargs)
+    #  @brief The genetic operator constructor
+    #  @param knapsack The Knapsack evaluation operator of the population
+    def __init__(self, knapsack=None, **kwargs):
+        super(KnapsackMutate, self).__init__(knapsack=knapsack, **kwargs)
+
+    def mutate(self, population):
+        pm = getattr(population, 'mutation_probability', 0.01 )
+        lethals = getattr(population, 'lethals', None )
+        if not lethals:
+            lethals = range(len(population.individuals))
+        lethals = np.asarray(lethals, dtype=np.intp)
+        mutated = lethals[np.random.random(len(lethals)) < pm]
+        objects = np.random.randint(0, len(self.knapsack.objectCosts), size=len(mutated))
+        keys = population.genotypeKeys(mutated)
+        for index, j, key in zip(mutated.tolist(), objects.tolist(), keys):
+            if self.knapsack.hasTotals(population, index, key):
+                self.knapsack.flip(population, index, [j])
+            else:
+                self.knapsack.flipBits(population, index, np.array([j], dtype=np.intp))
+    iterate = mutate
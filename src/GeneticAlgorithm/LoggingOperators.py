@@ -1,25 +1,46 @@
 import Core
+import GenotypeLibrary
+import io
+import os
+import sys
 import copy
+import heapq
+import Queue
+import threading
+import numpy as np
 
 ## @class BestLogger
 #  @brief This class stores the best individual of the population, if it is better than the last individual found.
+#
+#  The population is never modified: the best individual is found with a single pass over the population criteria, and it is only copied into the log when it is strictly better than the best logged so far.
+#  If hallOfFameSize is greater than zero, the operator also keeps the hallOfFameSize best distinct genotypes ever seen in a heap, see getHallOfFame.
 class BestLogger(Core.BasePeriodicOperator):
+    ## @fn __init__(self, criterion='fitness', maximize=True, iterationFrequency=1, hallOfFameSize=0, **kwargs)
+    #  @brief The genetic operator constructor
+    #  @param criterion The name of the individual property that is compared
+    #  @param maximize True if greater values of the criterion are better
+    #  @param hallOfFameSize The number of best distinct individuals kept in the hall of fame, 0 disables the hall of fame
     def __init__(self, **kwargs):
         self.bestLog = []
         self.numEvaluations = []
         self.criterion = 'fitness'
         self.maximize = True
         self.iterationFrequency = 1
+        self.hallOfFameSize = 0
+        ## @property hallOfFame A heap of (score, entryNumber, genotypeKey, individual) tuples, whose root is the worst individual in the hall of fame
+        self.hallOfFame = []
+        self.hallOfFameKeys = set()
+        self.hallOfFameEntries = 0
         super(BestLogger, self).__init__(**kwargs)
     
     ## @fn logCallback(self, population)
-    #  @brief Add a new individual to the log if it is different to the best logged so far
+    #  @brief Add a new individual to the log if it is better than the best logged so far
     def logCallback(self, population):        
         currentBest, newBest = self.getBest(population)
-        ## @todo Check individual fitness
-        if currentBest != newBest:
+        if currentBest is not newBest:
             self.addToLog( copy.deepcopy(newBest) )
-
+        if self.hallOfFameSize > 0:
+            self.updateHallOfFame(population)
             
     iterationCallback  = logCallback
     evaluationCallback = logCallback
@@ -29,53 +50,297 @@ class BestLogger(Core.BasePeriodicOperator):
     def addToLog(self, best):        
         self.numEvaluations.append( self.evaluationCounter )
         self.bestLog.append( best )
+
+    ## @fn getCriteria(self, population)
+    #  @brief Return a numpy vector that contains the comparison criterion of every individual in the population
+    def getCriteria(self, population):
+        if self.criterion == 'fitness':
+            return np.asarray(population.getFitness(), dtype=np.float64)
+        return np.array([getattr(individual, self.criterion) for individual in population.individuals], dtype=np.float64)
     
     ## @fn getBest(self, population)
-    #  @brief Get the best individual out of the list containing the population and the best individual found so far
+    #  @brief Get the best individual out of the population and the best individual found so far
+    #  @return A tuple (currentBest, newBest), where newBest is currentBest unless an individual of the population is strictly better
     def getBest(self, population): 
-        # Get the population size
-        n = len(population.individuals)
-        # Append the current best to the list of individuals           
-        candidates = population.individuals 
-        if len(self.bestLog) > 0:
-            currentBest = self.bestLog[-1]
-            candidates.append(currentBest)
-        else:
-            currentBest = None
-        # Get the comparison criteria from all individuals
-        criteria = [getattr(individual, self.criterion) for individual in candidates]
-        # Create and zip a lost of pointers 
-        indices  = range(n+1)
-        sortedFitness = sorted(zip(criteria, indices), key=lambda x: x[0])
-        # Select the best individual, according to target
-        if self.maximize:
-            best = sortedFitness[-1][1]
+        currentBest = self.bestLog[-1] if self.bestLog else None
+        # Find the best individual of the population in a single pass
+        criteria = self.getCriteria(population)
+        best = int(np.argmax(criteria) if self.maximize else np.argmin(criteria))
+        # Keep the current best unless the population contains a strictly better individual
+        if currentBest is not None:
+            currentCriterion = getattr(currentBest, self.criterion)
+            if not (criteria[best] > currentCriterion if self.maximize else criteria[best] < currentCriterion):
+                return (currentBest, currentBest)
+        return (currentBest, population.individuals[best])
+
+    ## @fn updateHallOfFame(self, population)
+    #  @brief Insert every individual of the population that is better than the worst one in the hall of fame, unless its genotype is already there
+    def updateHallOfFame(self, population):
+        # Scores are negated for minimization, so the heap root is always the worst individual in the hall of fame
+        scores = self.getCriteria(population) * (1.0 if self.maximize else -1.0)
+        if len(self.hallOfFame) >= self.hallOfFameSize:
+            candidates = np.flatnonzero(scores > self.hallOfFame[0][0])
         else:
-            best = sortedFitness[0][1]
-        # Return the best candidate
-        return (currentBest, candidates[best])
+            candidates = np.arange(len(scores))
+        # Visit the candidates from best to worst, so the heap is updated as little as possible
+        candidates = candidates[np.argsort(-scores[candidates], kind='mergesort')].tolist()
+        for i, key in zip(candidates, population.genotypeKeys(candidates)):
+            full = len(self.hallOfFame) >= self.hallOfFameSize
+            if key in self.hallOfFameKeys or (full and scores[i] <= self.hallOfFame[0][0]):
+                continue
+            entry = (scores[i], self.hallOfFameEntries, key, copy.deepcopy(population.individuals[i]))
+            self.hallOfFameEntries += 1
+            self.hallOfFameKeys.add(key)
+            if full:
+                self.hallOfFameKeys.discard( heapq.heapreplace(self.hallOfFame, entry)[2] )
+            else:
+                heapq.heappush(self.hallOfFame, entry)
+
+    ## @fn getHallOfFame(self)
+    #  @brief Return the individuals in the hall of fame, from the best to the worst
+    def getHallOfFame(self):
+        return [entry[3] for entry in sorted(self.hallOfFame, key=lambda entry: (-entry[0], entry[1]))]
     
     def finalize(self, population):
         for eval, individual in zip( self.numEvaluations, self.bestLog ):
             print ('%4d\t' % eval) + str(individual)
 
+## @var logMagic
+#  @brief The first bytes of every generation log file written by LogGenerations
+logMagic = 'GALOG001'
+
+## @fn logRecordType(nBytes)
+#  @brief Return the numpy dtype of a generation log record, whose genotype is stored in nBytes packed bytes
+#
+#  Every record stores one individual: the iteration counter and evaluation counter of its generation, its fitness and its packed genotype bits
+def logRecordType(nBytes):
+    return np.dtype([('generation', '<i8'), ('evaluations', '<i8'), ('fitness', '<f8'), ('genes', 'u1', (nBytes,))])
+
 ## @class LogGenerations
 #  @brief Log the full population of a GA 
+#
+#  By default every logged population is deep-copied and kept in memory until finalize prints the log.
+#  If a path is provided, the operator streams every logged population to an append-only binary file instead, which can be read with GenerationLogReader. The file contains:
+#  <ul>
+#    <li>A header: logMagic followed by the int64 values nBytes, nSegments and the nSegments segment lengths in bits</li>
+#    <li>Fixed-width records of type logRecordType(nBytes), one per individual and generation</li>
+#  </ul>
+#  The streaming mode requires binary genotypes, i.e. a BinaryPopulation or a Population whose segments have an nBits property (such as GenotypeLibrary.BinaryChromosomeSegment).
 class LogGenerations(Core.BasePeriodicOperator):
-    def __init__(self, **kwargs):
+    transientProperties = ('logFile', 'writerQueue', 'writerThread', 'writerError')
+    ## @fn __init__(self, path=None, background=False, bufferSize=1<<20, **kwargs)
+    #  @brief The genetic operator constructor
+    #  @param path The file where generations are streamed, the log is kept in memory if omitted
+    #  @param background If True, records are written to the file by a background thread
+    #  @param bufferSize The size, in bytes, of the file write buffer
+    def __init__(self, path=None, background=False, bufferSize=1<<20, **kwargs):
         self.generationLog  = []
         self.numEvaluations = []
+        self.path       = path
+        self.background = background
+        self.bufferSize = bufferSize
+        self.logFile      = None
+        self.writerQueue  = None
+        self.writerThread = None
+        self.writerError  = None
+        ## @property logOffset The size the log file is truncated to when it is reopened, set when a checkpoint is restored
+        self.logOffset    = None
         super(LogGenerations, self).__init__(**kwargs)
         
     def logPopulation(self, population):
             # Append the plain number of evaluations to the evaluation counter
             self.numEvaluations.append(self.evaluationCounter)            
-            # Make a deep copy of the population and log it
-            self.generationLog.append(copy.deepcopy(population))
+            if self.path:
+                # Stream the population to the log file
+                self.writeRecords(population)
+            else:
+                # Make a deep copy of the population and log it
+                self.generationLog.append(copy.deepcopy(population))
     
     iterationCallback  = logPopulation
     evaluationCallback = logPopulation
+
+    ## @fn openLog(self, population)
+    #  @brief Open the log file for appending, writing the header if the file is new, and start the writer thread if required
+    def openLog(self, population):
+        segmentBits = getattr(population, 'segmentBits', None)
+        if segmentBits is None:
+            segmentBits = [segment.nBits for segment in population.schema.segments]
+        self.segmentBits = [int(nBits) for nBits in segmentBits]
+        self.nBytes = (sum(self.segmentBits) + 7) // 8
+        self.recordType = logRecordType(self.nBytes)
+        logOffset = getattr(self, 'logOffset', None)
+        if logOffset is not None and os.path.exists(self.path) and os.path.getsize(self.path) > logOffset:
+            # Drop the records written after the restored checkpoint, or the partial record left by a crash
+            with io.open(self.path, 'r+b') as logFile:
+                logFile.truncate(logOffset)
+        self.logOffset = None
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            # Appending to an existing log requires the same genotype layout
+            if GenerationLogReader.readHeader(self.path)[0] != self.segmentBits:
+                raise ValueError('The genotype layout does not match the layout of the log file %s' % self.path)
+            self.logFile = io.open(self.path, 'ab', buffering=self.bufferSize)
+        else:
+            self.logFile = io.open(self.path, 'wb', buffering=self.bufferSize)
+            self.logFile.write(logMagic + np.array([self.nBytes, len(self.segmentBits)] + self.segmentBits, dtype='<i8').tobytes())
+        if self.background:
+            self.writerQueue  = Queue.Queue(maxsize=16)
+            self.writerThread = threading.Thread(target=self.writerLoop)
+            self.writerThread.daemon = True
+            self.writerThread.start()
+
+    ## @fn writerLoop(self)
+    #  @brief Write the records received through the writer queue until None is received, this function runs on the writer thread
+    #
+    #  If a write fails, the exception is kept in writerError and raised by the next writeRecords or closeLog call. The queue is still drained, so that writeRecords never blocks.
+    def writerLoop(self):
+        while True:
+            records = self.writerQueue.get()
+            try:
+                if records is None:
+                    break
+                if self.writerError is None:
+                    self.logFile.write(records.tobytes())
+            except Exception:
+                self.writerError = sys.exc_info()
+            finally:
+                self.writerQueue.task_done()
+
+    ## @fn raiseWriterError(self)
+    #  @brief Raise the exception of a failed write of the writer thread, if any
+    def raiseWriterError(self):
+        if self.writerError is not None:
+            errorType, error, errorTraceback = self.writerError
+            self.writerError = None
+            raise errorType, error, errorTraceback
+
+    ## @fn flushLog(self)
+    #  @brief Wait until the writer thread has written every queued record, flush the log file and return its size
+    def flushLog(self):
+        if self.writerQueue is not None:
+            self.writerQueue.join()
+            self.raiseWriterError()
+        self.logFile.flush()
+        return os.fstat(self.logFile.fileno()).st_size
+
+    ## @fn getState(self)
+    #  @brief Return the operator state, including the size of the log file at this point of the run
+    #
+    #  The log is flushed first, so the size covers every logged generation. When the state is restored, openLog truncates the file to this size before appending, so resuming a run does not repeat generations, nor keep a partial record.
+    def getState(self):
+        state = super(LogGenerations, self).getState()
+        if self.path:
+            if self.logFile is not None:
+                state['logOffset'] = self.flushLog()
+            else:
+                state['logOffset'] = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return state
+
+    ## @fn setState(self, state)
+    #  @brief Close the current log file, if any, and restore the operator state; the log is reopened at the restored offset by the next write
+    def setState(self, state):
+        self.closeLog()
+        super(LogGenerations, self).setState(state)
+
+    ## @fn writeRecords(self, population)
+    #  @brief Append one record per individual of population to the log file
+    def writeRecords(self, population):
+        if self.logFile is None:
+            self.openLog(population)
+        records = np.empty(len(population.individuals), dtype=self.recordType)
+        records['generation']  = self.iterationCounter
+        records['evaluations'] = self.evaluationCounter
+        records['fitness']     = population.getFitness()
+        genes = getattr(population, 'genes', None)
+        if genes is None:
+            genes = GenotypeLibrary.packSegmentData(population.segmentData(), self.segmentBits)
+        records['genes'] = genes
+        if self.writerQueue is not None:
+            self.raiseWriterError()
+            self.writerQueue.put(records)
+        else:
+            self.logFile.write(records.tobytes())
+
+    ## @fn closeLog(self)
+    #  @brief Wait for the writer thread and close the log file
+    def closeLog(self):
+        if self.writerThread is not None:
+            self.writerQueue.put(None)
+            self.writerThread.join()
+            self.writerQueue  = None
+            self.writerThread = None
+        if self.logFile is not None:
+            try:
+                self.logFile.close()
+            finally:
+                self.logFile = None
+        self.raiseWriterError()
     
     def finalize(self, population):
+        if self.path:
+            self.closeLog()
+            print 'Number of logged generations %d, written to %s' % (len(self.numEvaluations), self.path)
+            return
         for ev, pop in zip( self.numEvaluations, self.generationLog ):
-            print 'Number of evaluations %d' % ev + str(pop) + '\n'
\ No newline at end of file
+            print 'Number of evaluations %d' % ev + str(pop) + '\n'
+
+## @class GenerationLogReader
+#  @brief Read a generation log file written by LogGenerations without loading it in memory
+#
+#  The records are memory-mapped, so generations can be iterated over or sliced at any position of the file.
+#  @code
+#    log = GenerationLogReader('run.galog')
+#    for generation, evaluations, records in log.generations():
+#        print generation, evaluations, records['fitness'].max()
+#  @endcode
+class GenerationLogReader(Core.GABaseObject):
+    ## @fn __init__(self, path)
+    #  @brief Read the header of the log file and map its records
+    def __init__(self, path):
+        segmentBits, offset = GenerationLogReader.readHeader(path)
+        super(GenerationLogReader, self).__init__(path=path, segmentBits=segmentBits)
+        recordType = logRecordType( (sum(segmentBits) + 7) // 8 )
+        # A log whose writer was interrupted may end with a partial record, which is ignored
+        nRecords = (os.path.getsize(path) - offset) // recordType.itemsize
+        if nRecords > 0:
+            ## @property records A read-only memory-mapped numpy array of logRecordType records
+            self.records = np.memmap(path, dtype=recordType, mode='r', offset=offset, shape=(nRecords,))
+        else:
+            self.records = np.zeros(0, dtype=recordType)
+
+    ## @fn readHeader(path)
+    #  @brief Read the header of a log file
+    #  @return A tuple (segmentBits, offset), where offset is the position of the first record in the file
+    @staticmethod
+    def readHeader(path):
+        with io.open(path, 'rb') as logFile:
+            if logFile.read(len(logMagic)) != logMagic:
+                raise ValueError('%s is not a generation log file' % path)
+            nBytes, nSegments = np.frombuffer(logFile.read(16), dtype='<i8')
+            segmentBits = np.frombuffer(logFile.read(8*int(nSegments)), dtype='<i8').tolist()
+        return segmentBits, len(logMagic) + 16 + 8*int(nSegments)
+
+    def __len__(self):
+        return len(self.records)
+
+    ## @fn generations(self)
+    #  @brief Iterate over the logged generations
+    #  @return A generator of (generation, evaluations, records) tuples, where records is the slice of the memory-mapped records that belongs to the generation
+    def generations(self):
+        if len(self.records) == 0:
+            return
+        # Generations are contiguous, so a new one starts wherever the counters change
+        generation, evaluations = self.records['generation'], self.records['evaluations']
+        starts = np.flatnonzero((generation[1:] != generation[:-1]) | (evaluations[1:] != evaluations[:-1])) + 1
+        bounds = [0] + starts.tolist() + [len(self.records)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            yield int(generation[start]), int(evaluations[start]), self.records[start:end]
+
+    ## @fn segmentData(self, records)
+    #  @brief Return the segment values of the genotypes of the given records
+    #  @see GenotypeLibrary.unpackSegmentData
+    def segmentData(self, records):
+        return GenotypeLibrary.unpackSegmentData(records['genes'], self.segmentBits)
+
+    def __repr__(self):
+        return '%s(path = %r, segmentBits = %r, records = %d)' % (type(self).__name__, self.path, self.segmentBits, len(self.records))
@@ -6,6 +6,7 @@ import matplotlib.pyplot
 ## @class PlotBestLogger
 #  @brief A BestLogger specialization that plots the historic progression of the best criterion with each tick
 class PlotBestLogger(LoggingOperators.BestLogger):
+    transientProperties = ('criterionAxis', 'figure')
     #  @fn __init__(self, criterionAxis=None, figure=None, **kwargs)
     #  @brief The genetic operator constructor
     #  @pram criterionAxis A matplotlib axes object, used to plot the best found evaluation so far
@@ -0,0 +1,421 @@
+import Core
+import EvaluationOperators
+import SelectionOperators
+
+import os
+import copy
+import Queue
+import random
+import traceback
+import multiprocessing
+import numpy as np
+
+## @fn bestIndices(population, n)
+#  @brief Return the indices of the n best individuals of population, from the worst to the best
+def bestIndices(population, n):
+    order = np.argsort(np.asarray(population.getFitness(), dtype=np.float64), kind='mergesort')
+    return order[len(order)-n:] if population.maximize else order[:n][::-1]
+
+## @fn worstIndices(population, n)
+#  @brief Return the indices of the n worst individuals of population, from the best to the worst
+def worstIndices(population, n):
+    order = np.argsort(np.asarray(population.getFitness(), dtype=np.float64), kind='mergesort')
+    return order[:n][::-1] if population.maximize else order[len(order)-n:]
+
+## @fn runIsland(connection, scheduler, seed, migrationSize)
+#  @brief The main loop of an island worker process
+#  @param connection The worker end of the pipe that connects the island with the IslandScheduler
+#  @param scheduler The Scheduler that evolves the island population
+#  @param seed The seed of the random and numpy.random generators of the island
+#  @param migrationSize The number of individuals exported after every 'iterate' command
+#
+#  The worker randomizes and initializes its population, and then serves the following commands:
+#  <ul>
+#    <li>('iterate', k): Run k iterations (fewer if an operator requests a stop) and reply with a tuple (payload, stopReason), where payload holds the exported best migrationSize individuals</li>
+#    <li>('immigrate', payload): Replace the worst individuals with the exported individuals of the payload</li>
+#    <li>('finalize', None): Finalize the scheduler, reply with the population state and exit</li>
+#  </ul>
+def runIsland(connection, scheduler, seed, migrationSize):
+    random.seed(seed)
+    np.random.seed(seed)
+    scheduler.population.randomize()
+    scheduler.population.__dict__.pop('stopReason', None)
+    scheduler.initialize()
+    while True:
+        command, argument = connection.recv()
+        if command == 'iterate':
+            for i in xrange(argument):
+                if getattr(scheduler.population, 'stopReason', None):
+                    break
+                scheduler.iterate()
+            connection.send( (scheduler.population.exportIndividuals(bestIndices(scheduler.population, migrationSize)), \
+                              getattr(scheduler.population, 'stopReason', None)) )
+        elif command == 'immigrate':
+            immigrants = len(argument['fitness'])
+            scheduler.population.importIndividuals(worstIndices(scheduler.population, immigrants), argument)
+        elif command == 'finalize':
+            scheduler.finalize()
+            connection.send( scheduler.population.getState() )
+            break
+    connection.close()
+
+## @class IslandScheduler
+#  @brief A scheduler that evolves several populations (islands) in parallel, in separate processes, and periodically migrates individuals between them
+#
+#  Every island is a Scheduler with its own deep copy of the operators and of the population, which is randomized with its own seed when its process starts.
+#  Every migrationFrequency iterations, each island sends its migrationSize best individuals to the islands given by the topology:
+#  <ul>
+#    <li>'ring': Island i sends its migrants to island i+1</li>
+#    <li>'full': Every island sends its migrants to every other island</li>
+#    <li>'random': Every island sends its migrants to another island chosen at random</li>
+#  </ul>
+#  Each island keeps the migrationSize best individuals it received, which replace its worst individuals.
+#  Migrants travel through pipes as the compact payloads of Population.exportIndividuals, i.e. numpy arrays of segment data (or packed genotype rows) and fitness values.
+#  At the end of runGA, the final island populations are available in the islands property.
+#  If an operator of any island requests a stop (see GeneticOperator.requestStop), every island is finalized at the next migration, and the reason is stored in the stopReason property.
+#  @note Every island runs its own copy of the operators, so logging operators that write files must be given different paths, and plotting operators should be avoided.
+#  @code
+#    ga = SchedulerLibrary.IslandScheduler(population=p, operators=operators, nIslands=4, migrationFrequency=10, migrationSize=2, topology='ring')
+#    ga.runGA(1000)
+#  @endcode
+class IslandScheduler(Core.GABaseObject):
+    ## @fn __init__(self, name='Untitled', operators=[], population=Core.Population(), nIslands=None, migrationFrequency=10, migrationSize=1, topology='ring', seed=None, pollInterval=1.0, **kwargs)
+    #  @brief The IslandScheduler constructor
+    #  @param operators The list of operators run by every island
+    #  @param population The population copied into every island
+    #  @param nIslands The number of islands (and processes), the number of cpus is used if omitted
+    #  @param migrationFrequency The number of iterations between migrations
+    #  @param migrationSize The number of individuals sent by every island on each migration
+    #  @param topology One of 'ring', 'full' or 'random'
+    #  @param seed The seed of the first island, island i uses seed+i. A seed is drawn from the random module if omitted
+    #  @param pollInterval The number of seconds between checks that the island processes are still alive, while waiting for their replies
+    def __init__(self, name='Untitled', operators=[], population=Core.Population(), nIslands=None, migrationFrequency=10, migrationSize=1, topology='ring', seed=None, pollInterval=1.0, **kwargs):
+        if topology not in ('ring', 'full', 'random'):
+            raise ValueError('Unknown migration topology %s' % topology)
+        super(IslandScheduler, self).__init__(name=name, operators=operators, population=population, nIslands=nIslands or multiprocessing.cpu_count(), \
+                                              migrationFrequency=migrationFrequency, migrationSize=migrationSize, topology=topology, seed=seed, \
+                                              pollInterval=pollInterval, **kwargs)
+        self.islands = []
+
+    ## @fn destinations(self, i)
+    #  @brief Return the list of islands that receive the migrants of island i
+    def destinations(self, i):
+        others = [j for j in xrange(self.nIslands) if j != i]
+        if not others:
+            return []
+        if self.topology == 'ring':
+            return [(i+1) % self.nIslands]
+        elif self.topology == 'full':
+            return others
+        else:
+            return [random.choice(others)]
+
+    ## @fn migrate(self, emigrants)
+    #  @brief Compute the immigrants of every island
+    #  @param emigrants The list of payloads exported by every island
+    #  @return A list with the payload that each island receives, or None if an island receives no migrants
+    def migrate(self, emigrants):
+        received = [ [] for i in xrange(self.nIslands) ]
+        for i, payload in enumerate(emigrants):
+            for j in self.destinations(i):
+                received[j].append(payload)
+        immigrants = []
+        for payloads in received:
+            if not payloads:
+                immigrants.append(None)
+                continue
+            payload = dict( (key, np.concatenate([p[key] for p in payloads])) for key in payloads[0] )
+            # Keep only the best migrationSize individuals received
+            order = np.argsort(payload['fitness'].astype(np.float64), kind='mergesort')
+            keep  = order[len(order)-self.migrationSize:] if self.population.maximize else order[:self.migrationSize]
+            immigrants.append( dict( (key, value[keep]) for key, value in payload.iteritems() ) )
+        return immigrants
+
+    ## @fn runGA(self, n)
+    #  @brief Start the island processes, run n iterations on every island with periodic migrations, and finalize them
+    #  @param n The number of iterations to run on every island
+    def runGA(self, n):
+        seed = self.seed if self.seed is not None else random.randrange(1<<30)
+        connections, processes = [], []
+        for i in xrange(self.nIslands):
+            scheduler = Core.Scheduler(name='%s island %d' % (self.name, i), operators=copy.deepcopy(self.operators), population=copy.deepcopy(self.population))
+            connection, workerConnection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=runIsland, args=(workerConnection, scheduler, seed+i, self.migrationSize))
+            process.daemon = True
+            process.start()
+            # Only the worker keeps its end of the pipe open, so that recv sees the end of file if the worker dies
+            workerConnection.close()
+            connections.append(connection)
+            processes.append(process)
+        try:
+            # Run the islands between migrations
+            done = 0
+            self.stopReason = None
+            while done < n:
+                k = min(self.migrationFrequency or n, n - done)
+                for i, (connection, process) in enumerate(zip(connections, processes)):
+                    self.send(i, connection, process, ('iterate', k))
+                emigrants, stopReasons = zip(*[self.receive(i, connection, process) for i, (connection, process) in enumerate(zip(connections, processes))])
+                done += k
+                # The whole run stops as soon as one island requests a stop
+                self.stopReason = next((reason for reason in stopReasons if reason), None)
+                if self.stopReason:
+                    break
+                if done < n:
+                    for i, (connection, process, payload) in enumerate(zip(connections, processes, self.migrate(emigrants))):
+                        if payload is not None:
+                            self.send(i, connection, process, ('immigrate', payload))
+            # Collect the final populations
+            for i, (connection, process) in enumerate(zip(connections, processes)):
+                self.send(i, connection, process, ('finalize', None))
+            self.islands = []
+            for i, (connection, process) in enumerate(zip(connections, processes)):
+                island = copy.deepcopy(self.population)
+                island.setState(self.receive(i, connection, process))
+                self.islands.append(island)
+                process.join()
+        except:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            raise
+        finally:
+            for connection in connections:
+                connection.close()
+
+    ## @fn islandError(self, i, process)
+    #  @brief Return the RuntimeError raised when island i can not be reached
+    def islandError(self, i, process):
+        process.join(self.pollInterval)
+        return RuntimeError('Island %d exited with code %s' % (i, process.exitcode))
+
+    ## @fn send(self, i, connection, process, message)
+    #  @brief Send a command to island i, or raise a RuntimeError if its process has exited
+    def send(self, i, connection, process, message):
+        try:
+            connection.send(message)
+        except (IOError, EOFError):
+            raise self.islandError(i, process)
+
+    ## @fn receive(self, i, connection, process)
+    #  @brief Return the next reply of island i, or raise a RuntimeError if its process exits before replying
+    def receive(self, i, connection, process):
+        try:
+            while not connection.poll(self.pollInterval):
+                if not process.is_alive():
+                    raise self.islandError(i, process)
+            return connection.recv()
+        except (IOError, EOFError):
+            raise self.islandError(i, process)
+
+    ## @fn best(self)
+    #  @brief Return the best individual among all the islands
+    def best(self):
+        candidates = [island.individuals[bestIndices(island, 1)[0]] for island in self.islands]
+        fitness = [c.fitness for c in candidates]
+        return candidates[ fitness.index(max(fitness) if self.population.maximize else min(fitness)) ]
+
+## @fn evaluateOffspring(data)
+#  @brief Evaluate one individual inside a SteadyStateScheduler worker process
+#  @param data The segment data of the individual
+#  @return A tuple (fitness, phenotype), or ('error', message) if an evaluation operator raised an exception
+#
+#  The worker state is set by EvaluationOperators.initializeWorker, its operator is the list of evaluation operators, which are applied in order (e.g. a decoder followed by a fitness function).
+def evaluateOffspring(data):
+    try:
+        evaluators, schema = EvaluationOperators.workerState['operator'], EvaluationOperators.workerState['schema']
+        population = Core.Population(schema=schema, individuals=[])
+        population.individuals = [ population.buildIndividual(data) ]
+        for evaluator in evaluators:
+            population.setFitness([0], evaluator.evaluateBatch(population, [0]))
+        individual = population.individuals[0]
+        return individual.fitness, getattr(individual, 'phenotype', None)
+    except Exception:
+        return 'error', traceback.format_exc()
+
+## @fn initializeSteadyStateWorker(operator, schema, started)
+#  @brief Initialize a SteadyStateScheduler worker process with EvaluationOperators.initializeWorker, and report its process id
+#  @param started A multiprocessing.Queue that receives the process id of every worker when it starts
+def initializeSteadyStateWorker(operator, schema, started):
+    EvaluationOperators.initializeWorker(operator, schema)
+    started.put(os.getpid())
+
+## @class SteadyStateScheduler
+#  @brief An asynchronous steady-state scheduler, that keeps a pool of worker processes busy evaluating offspring
+#
+#  Instead of waiting for a whole generation to be evaluated, a new offspring is produced and dispatched as soon as an evaluation returns, so workers never wait for the slowest evaluation of a generation:
+#  <ol>
+#    <li>The initial population is evaluated on the pool, and the initialize function of every operator is called</li>
+#    <li>inFlight offspring are produced and dispatched to the workers</li>
+#    <li>Whenever an evaluation returns, the offspring replaces the individual chosen by the replacement operator (the worst individual with SelectionOperators.SelectLethals), and a new offspring is dispatched</li>
+#    <li>Every genSize insertions (one generation worth of evaluations), the iterate function of every operator in operators is called, e.g. to log the population or to request a stop (see GeneticOperator.requestStop)</li>
+#  </ol>
+#  Offspring are produced by the usual operators with population.genSize set to 1: the replacement operator chooses a slot, the selection operator fills the mating pool, and the crossover and mutation operators write the offspring in the slot.
+#  The offspring is then exported and the slot restored, so the population only contains evaluated individuals.
+#  @code
+#    ga = SchedulerLibrary.SteadyStateScheduler(population=p, evaluation=[GraphLibrary.Ordonez(), GraphLibrary.PathLengthFitness(graph=instanceGraph)], operators=[LoggingOperators.BestLogger(maximize=False)])
+#    ga.runGA(100)
+#  @endcode
+class SteadyStateScheduler(Core.GABaseObject):
+    ## @fn __init__(self, name='Untitled', population=Core.Population(), evaluation=[], selection=None, replacement=None, crossover=None, mutation=None, operators=[], processes=None, inFlight=None, pollInterval=1.0, resultTimeout=None, **kwargs)
+    #  @brief The SteadyStateScheduler constructor
+    #  @param evaluation A list of evaluation operators applied in order to every offspring on the worker processes, they must be picklable
+    #  @param selection The operator that fills the mating pool, SelectionOperators.KTournament by default
+    #  @param replacement The operator that chooses the individual replaced by each offspring, SelectionOperators.SelectLethals by default
+    #  @param crossover The crossover operator, Core.Crossover by default
+    #  @param mutation The mutation operator, Core.Mutate by default
+    #  @param operators Other operators (e.g. loggers), called once every genSize insertions
+    #  @param processes The number of worker processes, the number of cpus is used if omitted
+    #  @param inFlight The number of offspring being evaluated at any time, twice the number of processes if omitted
+    #  @param pollInterval The number of seconds between checks that the worker processes are still alive, while waiting for an evaluation
+    #  @param resultTimeout The number of seconds without any completed evaluation after which runGA gives up, no limit if omitted
+    def __init__(self, name='Untitled', population=Core.Population(), evaluation=[], selection=None, replacement=None, crossover=None, mutation=None, operators=[], processes=None, inFlight=None, \
+                 pollInterval=1.0, resultTimeout=None, **kwargs):
+        processes = processes or multiprocessing.cpu_count()
+        super(SteadyStateScheduler, self).__init__(name=name, population=population, evaluation=evaluation, \
+                                                   selection=selection or SelectionOperators.KTournament(), \
+                                                   replacement=replacement or SelectionOperators.SelectLethals(), \
+                                                   crossover=crossover or Core.Crossover(), mutation=mutation or Core.Mutate(), \
+                                                   operators=operators, processes=processes, inFlight=inFlight or 2*processes, \
+                                                   pollInterval=pollInterval, resultTimeout=resultTimeout, **kwargs)
+
+    ## @fn breed(self)
+    #  @brief Produce one offspring with the selection, crossover and mutation operators, without modifying the population
+    #  @return A tuple (payload, data) with the offspring as returned by population.exportIndividuals, and its segment data
+    def breed(self):
+        population = self.population
+        genSize = population.__dict__.get('genSize')
+        population.genSize = 1
+        try:
+            self.replacement.iterate(population)
+            slot  = population.lethals
+            saved = population.exportIndividuals(slot)
+            self.selection.iterate(population)
+            self.crossover.iterate(population)
+            self.mutation.iterate(population)
+            payload = population.exportIndividuals(slot)
+            data    = population.segmentData(slot)
+            population.importIndividuals(slot, saved)
+        finally:
+            self.restoreGenSize(genSize)
+        data = data.tolist() if hasattr(data, 'tolist') else data
+        return payload, data[0]
+
+    ## @fn insert(self, payload, fitness, phenotype)
+    #  @brief Replace the individual chosen by the replacement operator with an evaluated offspring
+    #  @param payload The offspring, as returned by breed
+    def insert(self, payload, fitness, phenotype):
+        population = self.population
+        genSize = population.__dict__.get('genSize')
+        population.genSize = 1
+        try:
+            self.replacement.iterate(population)
+            slot = population.lethals
+        finally:
+            self.restoreGenSize(genSize)
+        payload['fitness'] = np.array([fitness])
+        population.importIndividuals(slot, payload)
+        if phenotype is not None:
+            population.individuals[slot[0]].phenotype = phenotype
+
+    ## @fn restoreGenSize(self, genSize)
+    #  @brief Restore the genSize property of the population after producing or inserting an offspring
+    def restoreGenSize(self, genSize):
+        if genSize is None:
+            del self.population.genSize
+        else:
+            self.population.genSize = genSize
+
+    ## @fn runGA(self, n)
+    #  @brief Evaluate the initial population, evaluate n*genSize offspring asynchronously, and finalize the operators
+    #  @param n The number of generations worth of offspring to evaluate
+    def runGA(self, n):
+        population = self.population
+        generationSize = getattr(population, 'genSize', len(population.individuals))
+        total = n * generationSize
+        population.__dict__.pop('stopReason', None)
+        started = multiprocessing.Queue()
+        pool = multiprocessing.Pool(self.processes, initializeSteadyStateWorker, (self.evaluation, population.schema, started))
+        workers = set()
+        try:
+            # Evaluate the initial population
+            data = population.segmentData()
+            data = data.tolist() if hasattr(data, 'tolist') else data
+            initial = pool.map_async(evaluateOffspring, data)
+            for i, result in enumerate(self.wait(workers, started, initial.get)):
+                self.checkResult(result)
+                population.setFitness([i], [result[0]])
+                if result[1] is not None:
+                    population.individuals[i].phenotype = result[1]
+            for o in self.operators:
+                o.initialize(population)
+            # Keep inFlight offspring on the workers at all times
+            results = Queue.Queue()
+            pending = {}
+            def dispatch(ticket):
+                payload, data = self.breed()
+                pending[ticket] = payload
+                pool.apply_async(evaluateOffspring, (data,), callback=lambda result: results.put((ticket, result)))
+            dispatched = 0
+            while dispatched < min(self.inFlight, total):
+                dispatch(dispatched)
+                dispatched += 1
+            for completed in xrange(1, total+1):
+                ticket, result = self.wait(workers, started, lambda timeout: results.get(timeout=timeout))
+                self.checkResult(result)
+                self.insert(pending.pop(ticket), result[0], result[1])
+                if completed % generationSize == 0:
+                    for o in self.operators:
+                        o.iterate(population)
+                    if getattr(population, 'stopReason', None):
+                        break
+                if dispatched < total:
+                    dispatch(dispatched)
+                    dispatched += 1
+            for o in self.operators:
+                o.finalize(population)
+        except:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
+            started.close()
+
+    ## @fn collectWorkerPids(self, workers, started)
+    #  @brief Add the process ids reported by the workers started since the last call to the set workers
+    #  @param started The queue filled by initializeSteadyStateWorker
+    #
+    #  The pool replaces a worker that dies, and the task it was running is lost, so more than processes ids mean that an evaluation will never complete.
+    def collectWorkerPids(self, workers, started):
+        while True:
+            try:
+                workers.add(started.get_nowait())
+            except Queue.Empty:
+                return workers
+
+    ## @fn wait(self, workers, started, get)
+    #  @brief Wait for a result of the pool, checking every pollInterval seconds that no worker has been replaced
+    #  @param workers The set of worker process ids reported so far, updated with collectWorkerPids
+    #  @param started The queue filled by initializeSteadyStateWorker
+    #  @param get A function that receives a timeout and returns a result, or raises Queue.Empty or multiprocessing.TimeoutError
+    #
+    #  A RuntimeError is raised if a worker exits, or if no result arrives within resultTimeout seconds. Waiting with a timeout also keeps the main process responsive to KeyboardInterrupt.
+    def wait(self, workers, started, get):
+        waited = 0.0
+        while True:
+            try:
+                return get(self.pollInterval)
+            except (Queue.Empty, multiprocessing.TimeoutError):
+                waited += self.pollInterval
+                if len(self.collectWorkerPids(workers, started)) > self.processes:
+                    raise RuntimeError('A worker process exited during an evaluation')
+                if self.resultTimeout is not None and waited >= self.resultTimeout:
+                    raise RuntimeError('No evaluation completed in %g seconds' % waited)
+
+    ## @fn checkResult(self, result)
+    #  @brief Raise a RuntimeError if a worker reported an evaluation error
+    def checkResult(self, result):
+        if result[0] == 'error':
+            raise RuntimeError('Evaluation failed on a worker process:\n%s' % result[1])
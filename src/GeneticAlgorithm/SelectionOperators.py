@@ -1,5 +1,6 @@
 import copy
 import random
+import numpy as np
 from Core import *
 
 ## @class SelectLethals
@@ -9,22 +10,34 @@ from Core import *
 class SelectLethals(GeneticOperator):
     ## @fn select(self, population)
     #  @brief Select the individuals to replace based on the population.maximize flag and the population.genSize property
+    #
+    #  Instead of sorting the whole population, the fitness of the mth worst individual is found with a partial selection in O(n), and only the m selected individuals are sorted.
+    #  Ties are broken by index exactly as the stable sort of (fitness, index) tuples would, so the lethals and their order are the same as with a full sort.
     def select(self, population):        
         # Get the population size
         n = len(population.individuals)
         # Get the amount of offspring to produce (2*m = len(mating_pool))
-        m = getattr(population, 'genSize', n)
-        #  Get a fitness vector out of the individual vector        
-        fitness = [individual.fitness for individual in population.individuals]
-        indices = range(n)
-        sortedFitness = sorted(zip(fitness, indices), key=lambda x: x[0])
+        m = min(getattr(population, 'genSize', n), n)
+        #  Get the fitness vector of the population
+        fitness = np.asarray(population.getFitness(), dtype=np.float64)
+        # NaN fitness values are the worst possible, otherwise they would never compare equal to the threshold
+        fitness = np.where(np.isnan(fitness), -np.inf if population.maximize else np.inf, fitness)
         # Select the m worse individuals in the generation to be replaced
-        if population.maximize:
-            L = sortedFitness[:m]
+        if m <= 0:
+            L = np.array([], dtype=np.intp)
+        elif population.maximize:
+            # The m lowest fitness values, the lowest indices are preferred among ties
+            threshold = np.partition(fitness, m-1)[m-1]
+            worse = np.flatnonzero(fitness < threshold)
+            L = np.concatenate((worse, np.flatnonzero(fitness == threshold)[:m-len(worse)]))
         else:
-            L = sortedFitness[-m:]
-        # Update the lethals vector
-        population.lethals = [l[1] for l in L]
+            # The m highest fitness values, the highest indices are preferred among ties
+            threshold = np.partition(fitness, n-m)[n-m]
+            worse = np.flatnonzero(fitness > threshold)
+            ties = np.flatnonzero(fitness == threshold)
+            L = np.concatenate((worse, ties[len(ties)-(m-len(worse)):]))
+        # Update the lethals vector, sorted by fitness and then by index
+        population.lethals = L[np.lexsort((L, fitness[L]))].tolist()
     # Select individuals for replacement only during the iterate phase of runGA    
     iterate     = select
 
@@ -55,15 +68,26 @@ class KTournament(GeneticOperator):
     # 
     #  The k-tournament selection algorithm consists on creating tournaments in which k random individuals participate. The best individual is selected for each tournament, and is selected to belong to the mating pool.
     #  M torunaments are performed, where M is equal to population.genSize (or n if this property is not found)
+    #
+    #  All the tournaments are played at once: the contenders are drawn as a (2*m x k) matrix of indices, and the winner of every row is found with a single argmax (or argmin).
+    #  As in selectBest, ties are won by the last contender drawn when maximizing, and by the first one when minimizing.
+    #  @note The contenders are drawn with numpy.random
     def select(self, population):
         # Number of individuals
         n = len(population.individuals)
         # Get the amount of offspring to produce (2*m = len(mating_pool))
         m = getattr(population, 'genSize', n)
         # Compute the contenders for each torunament
-        tournaments = [ [random.randrange(n) for contender in xrange(self.k) ] for tournament in xrange(2*m) ]
+        tournaments = np.random.randint(0, n, size=(2*m, self.k))
+        # Gather the fitness of every contender
+        fitness = np.asarray(population.getFitness(), dtype=np.float64)[tournaments]
+        # Find the position of the winner of each tournament
+        if population.maximize:
+            winners = (self.k - 1) - np.argmax(fitness[:, ::-1], axis=1)
+        else:
+            winners = np.argmin(fitness, axis=1)
         # Put the tournament winners on the mating pool
-        population.matingPool = [self.selectBest(contenders, population) for contenders in tournaments ]
+        population.matingPool = tournaments[np.arange(2*m), winners].tolist()
     # Make iterate function call select instead
     iterate = select
                 
@@ -73,45 +97,36 @@ class KTournament(GeneticOperator):
 #  This class performs SUS for both maximization or minimization, the mating pool is simply a list of indices that point to the parents. If minimization is desired, the population.maximize flag must be set to False.
 #  If population.genSize exists, the mating pool will be twice that number (to produce the same number of offspring); If this parameter does not exist, the mating pool will have twice the length of population.individuals
 class SUSSelection(GeneticOperator):
+    ## @fn select(self, population)
+    #  @brief Perform the stochastic universal sampling
+    #
+    #  The 2*m equidistant ticks are increasing, so all of them are located on the cumulative distribution function with a single binary search pass, for a cost of O(n + m log n)
     def select(self, population):
         # Number of individuals
         n = len(population.individuals)
         # Fitness vector
-        fit = [ind.fitness for ind in population.individuals]
+        fit = np.asarray(population.getFitness(), dtype=np.float64)
         # Adjust the pdf for minimization
         if not population.maximize:
-            pdf = [0.0]*n
-            M = max(fit) + (1.0)
-            for i in xrange(n):
-                pdf[i] = M - fit[i]
+            pdf = (fit.max() + 1.0) - fit
         else:
-            pdf = fit        
-        # Normalization factor
-        F = reduce(lambda x, y: x+y, pdf)
+            pdf = fit
+        # Normalization factor (the sequential sum, which matches the last entry of the cumulative sum)
+        F = np.cumsum(pdf)[-1]
         # Cumulative distribution function
-        cdf = [pdf[0]/F] *n
-        # Probability distribution function
-        for i in xrange(1, n):
-            cdf[i] = cdf[i-1] + pdf[i]/F            
+        cdf = np.cumsum(pdf / F)
         # Get the amount of offspring to produce (2*m = len(mating_pool))
         m = getattr(population, 'genSize', n)
         # Distance between ticks in SUS -> 1/2*m := 0.5/m
         delta = 0.5/m
-        # Initialize the mating pool
-        matingPool = [ 0 ] * (2*m)
-        # SUS implements a roulette with 2*m equidistant ticks, this variable stores the position of the current tick (as a probability)
-        currentTick = delta * random.random()
-        # Generate 2*m parent pointers 
-        for i in xrange(2*m):
-            # Find the first entry on the cdf that is greater than or equal to the current tick
-            for slicePointer in xrange(n):
-                if cdf[slicePointer] > currentTick:
-                    break
-            # The ith element on the maitingPool is slice pointer
-            matingPool[i] = slicePointer
-            currentTick += delta
-            while currentTick > 1.0:
-                currentTick -= 1.0
+        # SUS implements a roulette with 2*m equidistant ticks, the first tick is placed randomly within [0, delta)
+        ticks = np.empty(2*m)
+        ticks[0]  = delta * random.random()
+        ticks[1:] = delta
+        ticks = np.cumsum(ticks)
+        ticks[ticks > 1.0] -= 1.0
+        # The ith parent pointer is the first entry on the cdf that is greater than the ith tick (or the last entry if there is none)
+        matingPool = np.minimum(np.searchsorted(cdf, ticks, side='right'), n-1).tolist()
         random.shuffle(matingPool)
         population.matingPool = matingPool
-    iterate = select    
+    iterate = select
@@ -0,0 +1,113 @@
+import Core
+
+import time
+import numpy as np
+
+## @class TimeBudget
+#  @brief Stop the run once it has used seconds of wall-clock time
+#
+#  The time is measured between calls, so the time spent before a checkpoint is still counted after Scheduler.resume, but the time the run was stopped is not.
+class TimeBudget(Core.GeneticOperator):
+    transientProperties = ('lastTime',)
+    ## @fn __init__(self, seconds=60.0, **kwargs)
+    #  @brief The operator constructor
+    #  @param seconds The wall-clock budget of the run
+    def __init__(self, seconds=60.0, **kwargs):
+        super(TimeBudget, self).__init__(seconds=seconds, elapsed=0.0, lastTime=None, **kwargs)
+
+    ## @fn initialize(self, population)
+    #  @brief Start the clock
+    def initialize(self, population):
+        self.elapsed  = 0.0
+        self.lastTime = time.time()
+
+    ## @fn iterate(self, population)
+    #  @brief Add the time spent since the last call, and request a stop if the budget is exhausted
+    def iterate(self, population):
+        now = time.time()
+        if self.lastTime is not None:
+            self.elapsed += now - self.lastTime
+        self.lastTime = now
+        if self.elapsed >= self.seconds:
+            self.requestStop(population, 'Time budget of %g seconds exhausted' % self.seconds)
+
+## @class EvaluationBudget
+#  @brief Stop the run once maxEvaluations individuals have been evaluated
+#
+#  The evaluations are counted by BasePeriodicOperator (population.genSize per iteration), plus the initial population.
+class EvaluationBudget(Core.BasePeriodicOperator):
+    ## @fn __init__(self, maxEvaluations=10000, **kwargs)
+    #  @brief The operator constructor
+    #  @param maxEvaluations The number of evaluations allowed
+    def __init__(self, maxEvaluations=10000, **kwargs):
+        super(EvaluationBudget, self).__init__(maxEvaluations=maxEvaluations, **kwargs)
+
+    ## @fn initialize(self, population)
+    #  @brief Count the evaluations of the initial population
+    def initialize(self, population):
+        self.iterationCounter  = 0
+        self.evaluationCounter = len(population.individuals)
+
+    ## @fn iterate(self, population)
+    #  @brief Count the evaluations of this iteration, and request a stop if the budget is exhausted
+    def iterate(self, population):
+        super(EvaluationBudget, self).iterate(population)
+        if self.evaluationCounter >= self.maxEvaluations:
+            self.requestStop(population, 'Evaluation budget of %d individuals exhausted' % self.maxEvaluations)
+
+## @class TargetFitness
+#  @brief Stop the run once an individual reaches the target fitness
+#
+#  The comparison follows the population.maximize flag: the target is reached when the best fitness is greater (or lower, when minimizing) than or equal to target.
+class TargetFitness(Core.GeneticOperator):
+    ## @fn __init__(self, target=0.0, **kwargs)
+    #  @brief The operator constructor
+    #  @param target The fitness that ends the run
+    def __init__(self, target=0.0, **kwargs):
+        super(TargetFitness, self).__init__(target=target, **kwargs)
+
+    ## @fn iterate(self, population)
+    #  @brief Request a stop if the best individual of the population reaches the target
+    def iterate(self, population):
+        fitness = np.asarray(population.getFitness())
+        if population.maximize:
+            reached = fitness.max() >= self.target
+        else:
+            reached = fitness.min() <= self.target
+        if reached:
+            self.requestStop(population, 'Target fitness %g reached' % self.target)
+    initialize = iterate
+
+## @class Stagnation
+#  @brief Stop the run when the best fitness found so far has not improved during generations iterations
+class Stagnation(Core.GeneticOperator):
+    ## @fn __init__(self, generations=50, tolerance=0.0, **kwargs)
+    #  @brief The operator constructor
+    #  @param generations The number of iterations without improvement that ends the run
+    #  @param tolerance The minimum change of the best fitness that counts as an improvement
+    def __init__(self, generations=50, tolerance=0.0, **kwargs):
+        super(Stagnation, self).__init__(generations=generations, tolerance=tolerance, best=None, stagnantGenerations=0, **kwargs)
+
+    ## @fn initialize(self, population)
+    #  @brief Take the best fitness of the initial population as the best so far
+    def initialize(self, population):
+        self.best = self.bestFitness(population)
+        self.stagnantGenerations = 0
+
+    ## @fn bestFitness(self, population)
+    #  @brief Return the best fitness of the population
+    def bestFitness(self, population):
+        fitness = np.asarray(population.getFitness())
+        return float(fitness.max() if population.maximize else fitness.min())
+
+    ## @fn iterate(self, population)
+    #  @brief Update the best fitness so far, and request a stop if it has not improved for too long
+    def iterate(self, population):
+        best = self.bestFitness(population)
+        if self.best is None or (best - self.best if population.maximize else self.best - best) > self.tolerance:
+            self.best = best
+            self.stagnantGenerations = 0
+        else:
+            self.stagnantGenerations += 1
+        if self.stagnantGenerations >= self.generations:
+            self.requestStop(population, 'No improvement during %d generations' % self.generations)
@@ -7,6 +7,9 @@ import SelectionOperators
 import LoggingOperators
 import PlottingOperators
 import GraphLibrary
+import SchedulerLibrary
+import TerminationOperators
+import KnapsackLibrary
 
 ## @mainpage The GeneticAlgorithm documentation
 #
@@ -17,7 +20,7 @@ import GraphLibrary
 #    
 #    This is the documentation page for the GeneticAlgorithm framework. This framework can be freely distributed and used for non-comercial purposes. Any comercial uses are still free, but required to provide this code to comply with the GNU public license and to notify the author (david.said@gmail.com) who can use reference the commercial application for marketing and promotion purposes. Non commercial applications, especially educational are also encouraged to establish contact and provide feedback to the author.   
 #    
-#    This framework is designed with little external dependencies, but there are some. It has been written with Python 2.7 in mind, however, if enough demand for a python 3 compliant implementation is present, I will gladly make an effort. The only known dependency so far is matplotlib, which is referenced in the install and external dependencies sections below.  
+#    This framework is designed with little external dependencies, but there are some. It has been written with Python 2.7 in mind, however, if enough demand for a python 3 compliant implementation is present, I will gladly make an effort. The known dependencies so far are matplotlib and numpy, which are referenced in the install and external dependencies sections below.  
 #
 #    Please keep in mind that this framework is a work in progress, and better documentation will gradually be produced. In the meantime, do contact me with any questions you may have, I will be happy to answer.
 #
@@ -43,11 +46,18 @@ import GraphLibrary
 #        <li>Download: <a href="http://matplotlib.org/">matplotlib.org</a></li>
 #    </ul>
 #
+#  @subsection MainNumpy NumPy
+#    The array-backed populations and vectorized operators (e.g. GenotypeLibrary.BinaryPopulation) store genotypes and fitness values in numpy arrays. NumPy 1.10 or later is required, and 1.16 is the last release that supports Python 2.7. Please refer to the links below for more information
+#    <ul>
+#        <li>Documentation: <a href="http://docs.scipy.org/doc/">docs.scipy.org</a></li>
+#        <li>Download: <a href="http://www.numpy.org/">numpy.org</a></li>
+#    </ul>
+#
 #  @section MainInstall Installation instructions
 #    
 #  <ol>
 #    <li>Clone this repository to your system using your favorite method. Refer to the links above if required.</li>
-#    <li>Install Python and Matplotlib. Again, refer to the links above if necessary.</li>
+#    <li>Install Python, Matplotlib and NumPy. Again, refer to the links above if necessary.</li>
 #    <li>Add the src/ directory to your PYTHONPATH. Take a look at this <a href="http://www.stereoplex.com/blog/understanding-imports-and-pythonpath">article</a> by Dan Fairs if you need more information.</li>
 #    <li>Run the /src/examples/GADemo.py to test your installation. If it works, you're done!</li>
 #  </ol>
\ No newline at end of file
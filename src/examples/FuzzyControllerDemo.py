@@ -0,0 +1,83 @@
+from GeneticAlgorithm import *
+from FuzzyLogic.Core import TriangularSet, UniversalSet, NDFuzzifier
+from FuzzyLogic.InferenceLibrary import Rule, SugenoRuleBase, MamdaniRuleBase
+
+import time
+import random
+import numpy as np
+
+## @class FuzzyMutationControl
+#  @brief A genetic operator that sets the mutation probability of the population every generation with a fuzzy controller
+#
+#  The controller receives the diversity of the population, measured as the coefficient of variation of its fitness and clipped to [0, 1], and the progress of the run, the fraction of nGenerations elapsed.
+class FuzzyMutationControl(Core.GeneticOperator):
+    def __init__(self, controller=None, nGenerations=100, **kwargs):
+        super(FuzzyMutationControl, self).__init__(controller=controller, nGenerations=nGenerations, generation=0, trace=[], **kwargs)
+
+    def initialize(self, population):
+        self.generation = 0
+        self.trace = []
+        self.iterate(population)
+
+    def iterate(self, population):
+        fitness = np.asarray(population.getFitness(), dtype=np.float64)
+        diversity = min(1.0, fitness.std() / max(abs(fitness.mean()), 1e-12))
+        progress = min(1.0, float(self.generation) / self.nGenerations)
+        population.mutation_probability = self.controller.evaluate(diversity, progress)
+        self.trace.append(population.mutation_probability)
+        self.generation += 1
+
+## @fn mutationController(Base, **kwargs)
+#  @brief Return a rule base that raises the mutation probability when the diversity is low, and lowers it as the run progresses
+def mutationController(Base, **kwargs):
+    low, medium, high = TriangularSet(-1.0, 0.0, 0.5), TriangularSet(0.0, 0.5, 1.0), TriangularSet(0.5, 1.0, 2.0)
+    if Base is SugenoRuleBase:
+        small, moderate, large = 0.005, 0.03, 0.1
+    else:
+        small, moderate, large = TriangularSet(-0.05, 0.0, 0.05), TriangularSet(0.0, 0.03, 0.06), TriangularSet(0.02, 0.1, 0.18)
+    return Base([Rule(NDFuzzifier(low, UniversalSet()), consequent=large),
+                 Rule(NDFuzzifier(medium, low), consequent=large, weight=0.5),
+                 Rule(NDFuzzifier(medium, medium), consequent=moderate),
+                 Rule(NDFuzzifier(medium, high), consequent=small, weight=0.5),
+                 Rule(NDFuzzifier(high, UniversalSet()), consequent=small),
+                 Rule(NDFuzzifier(UniversalSet(), high), consequent=small, weight=0.5)], **kwargs)
+
+## This code runs only when this script is executed as main
+if __name__=='__main__':
+    random.seed(0)
+    np.random.seed(0)
+
+    # The controllers, compiled to lookup tables over [0, 1] x [0, 1]
+    sugeno = mutationController(SugenoRuleBase)
+    mamdani = mutationController(MamdaniRuleBase, outputRange=(0.0, 0.2), resolution=201)
+    diversity, progress = np.random.random((2, 100000))
+    for controller in (sugeno, mamdani):
+        start = time.time()
+        exact = controller.evaluate(diversity, progress)
+        exactTime = time.time() - start
+        controller.compile([(0.0, 1.0), (0.0, 1.0)], resolution=65)
+        start = time.time()
+        compiled = controller.evaluate(diversity, progress)
+        compiledTime = time.time() - start
+        print '%-16s exact %.4fs compiled %.4fs max error %.5f' % (type(controller).__name__, exactTime, compiledTime, np.abs(exact - compiled).max())
+
+    # A knapsack instance solved with the mutation probability adapted by the compiled Mamdani controller
+    nObjects = 200
+    nGenerations = 200
+    objectVolumes = [random.randrange(1, 20) for i in xrange(nObjects)]
+    objectCosts = [random.randrange(10, 20) for i in xrange(nObjects)]
+    maxVolume = sum(objectVolumes) / 2
+    ch = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=1) for i in xrange(nObjects)])
+    p  = GenotypeLibrary.BinaryPopulation(schema=ch, popSize=200, genSize=40, maximize=True, mutation_probability=0.01)
+    control = FuzzyMutationControl(controller=mamdani, nGenerations=nGenerations)
+    ga = Core.Scheduler(name='FuzzyControl',\
+                        population=p,\
+                        operators=[KnapsackLibrary.Knapsack(maxVolume, objectVolumes, maxVolume*10, objectCosts),\
+                                   control,\
+                                   SelectionOperators.KTournament(),\
+                                   SelectionOperators.SelectLethals(),\
+                                   Core.Crossover(),\
+                                   Core.Mutate()])
+    ga.runGA(nGenerations)
+    print 'Best fitness', max(p.getFitness())
+    print 'Mutation probability every 20 generations', ['%.3f' % pm for pm in control.trace[::20]]
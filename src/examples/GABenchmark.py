@@ -0,0 +1,176 @@
+# The benchmarks run without a display, so matplotlib must not open windows
+import matplotlib
+matplotlib.use('Agg')
+
+from GeneticAlgorithm import *
+from GADemo import NumOnes
+
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import itertools
+import multiprocessing
+import numpy as np
+
+## @page BenchmarkPage Benchmarking the GeneticAlgorithm framework
+#
+#  This script runs headless, reproducible benchmarks of the GA core and operators, and stores the results as JSON so that different versions of the framework can be compared.
+#  The following workloads are available:
+#  <ul>
+#    <li>onemax: Maximize the number of ones of a binary genotype of length bits, evaluated with GADemo.NumOnes</li>
+#    <li>knapsack: A random knapsack instance of length objects, evaluated with KnapsackLibrary.Knapsack</li>
+#    <li>tsp: A random traveling salesman instance of length nodes, decoded with GraphLibrary.Ordonez and evaluated with GraphLibrary.PathLengthFitness</li>
+#  </ul>
+#  Every workload runs over the grid of population sizes, genotype lengths and generations given in the command line.
+#  Each configuration runs in its own process, with fixed seeds, and reports generations/sec, evaluations/sec, its peak memory and the OperatorProfiler breakdown of every operator.
+#  @code
+#    python GABenchmark.py --workloads onemax tsp --popSizes 100 400 --lengths 32 128 --generations 100 --output new.json
+#    python GABenchmark.py --workloads onemax tsp --popSizes 100 400 --lengths 32 128 --generations 100 --output new.json --compare old.json
+#  @endcode
+
+## @fn oneMaxOperators(length)
+#  @brief Return the schema, the maximize flag and the evaluation operators of a OneMax instance of length bits
+def oneMaxOperators(length):
+    # NumOnes.evaluateBatch packs segments of any width, so the genotype is a single segment of length bits
+    schema = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=length)])
+    return schema, True, [NumOnes()]
+
+## @fn knapsackOperators(length)
+#  @brief Return the schema, the maximize flag and the evaluation operators of a random knapsack instance of length objects
+def knapsackOperators(length):
+    objectVolumes = [random.randrange(1, 20) for i in xrange(length)]
+    objectCosts = [random.randrange(10, 20) for i in xrange(length)]
+    maxVolume = sum(objectVolumes) / 2
+    schema = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=1) for i in xrange(length)])
+    return schema, True, [KnapsackLibrary.Knapsack(maxVolume, objectVolumes, maxVolume*10, objectCosts)]
+
+## @fn tspOperators(length)
+#  @brief Return the schema, the maximize flag and the evaluation operators of a random TSP instance of length nodes
+def tspOperators(length):
+    graph = GraphLibrary.Graph(N=length)
+    schema = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=int(math.ceil(math.log(i+1, 2)))) for i in xrange(1, length)])
+    return schema, False, [GraphLibrary.Ordonez(), GraphLibrary.PathLengthFitness(graph=graph)]
+
+## @var workloads
+#  @brief The benchmark workloads, indexed by name
+workloads = { 'onemax'   : oneMaxOperators,
+              'knapsack' : knapsackOperators,
+              'tsp'      : tspOperators }
+
+## @var populationTypes
+#  @brief The population classes that can be benchmarked, indexed by name
+populationTypes = { 'object' : Core.Population,
+                    'binary' : GenotypeLibrary.BinaryPopulation }
+
+## @fn runConfiguration(configuration)
+#  @brief Run one benchmark configuration and return its results
+#  @param configuration A dictionary with the workload, population, popSize, length, generations, genFraction and seed keys
+def runConfiguration(configuration):
+    random.seed(configuration['seed'])
+    np.random.seed(configuration['seed'])
+    schema, maximize, evaluation = workloads[configuration['workload']](configuration['length'])
+    popSize = configuration['popSize']
+    genSize = max(2, int(popSize * configuration['genFraction']))
+    population = populationTypes[configuration['population']](schema=schema, popSize=popSize, genSize=genSize, \
+                                                              maximize=maximize, mutation_probability=0.01)
+    profiler = Core.OperatorProfiler(printSummary=False)
+    ga = Core.Scheduler(name=configuration['workload'], population=population, profiler=profiler, \
+                        operators=evaluation + [SelectionOperators.KTournament(), \
+                                                SelectionOperators.SelectLethals(), \
+                                                Core.Crossover(), \
+                                                Core.Mutate()])
+    start = time.time()
+    ga.runGA(configuration['generations'])
+    seconds = time.time() - start
+    fitness = np.asarray(population.getFitness(), dtype=np.float64)
+    result = dict(configuration)
+    result.update({ 'seconds'        : seconds,
+                    'generationsPerSecond' : configuration['generations'] / seconds,
+                    'evaluationsPerSecond' : (popSize + configuration['generations'] * genSize) / seconds,
+                    'peakMemory'     : Core.peakMemory(),
+                    'bestFitness'    : float(fitness.max() if maximize else fitness.min()),
+                    'operators'      : profiler.summary() })
+    return result
+
+## @fn configurationKey(configuration, population=True)
+#  @brief Return the tuple that identifies a configuration when comparing two benchmark files
+#  @param population If False, the population type is left out of the key, so that binary and object runs of the same configuration match
+def configurationKey(configuration, population=True):
+    keys = ('workload', 'population', 'popSize', 'length', 'generations', 'genFraction', 'seed') if population else \
+           ('workload', 'popSize', 'length', 'generations', 'genFraction', 'seed')
+    return tuple(configuration[key] for key in keys)
+
+## @fn compare(results, baseline)
+#  @brief Print the speedup of every configuration of results with respect to the same configuration in baseline
+#
+#  A configuration is compared with the baseline run of the same population type if there is one, and with a run of any population type otherwise, e.g. to compare a binary run with an object run.
+def compare(results, baseline):
+    reference = dict( (configurationKey(r), r) for r in baseline['results'] )
+    anyPopulation = dict( (configurationKey(r, False), r) for r in baseline['results'] )
+    print '%-10s %-7s %-7s %8s %7s %6s %16s %16s %8s' % ('workload', 'pop', 'base', 'popSize', 'length', 'gens', 'evals/s', 'baseline', 'speedup')
+    matched = 0
+    for r in results:
+        old = reference.get(configurationKey(r)) or anyPopulation.get(configurationKey(r, False))
+        if old is None:
+            continue
+        matched += 1
+        print '%-10s %-7s %-7s %8d %7d %6d %16.1f %16.1f %7.2fx' % (r['workload'], r['population'], old['population'], r['popSize'], r['length'], r['generations'], \
+                                                                  r['evaluationsPerSecond'], old['evaluationsPerSecond'], \
+                                                                  r['evaluationsPerSecond'] / old['evaluationsPerSecond'])
+    if matched == 0:
+        print 'Warning: no configuration of this run matches a configuration of the baseline'
+
+## @fn main(arguments)
+#  @brief Run the benchmark grid described by the command line arguments
+def main(arguments):
+    parser = argparse.ArgumentParser(description='Headless benchmarks of the GeneticAlgorithm framework')
+    parser.add_argument('--workloads', nargs='+', default=sorted(workloads), choices=sorted(workloads))
+    parser.add_argument('--population', default='binary', choices=sorted(populationTypes))
+    parser.add_argument('--popSizes', nargs='+', type=int, default=[100, 400])
+    parser.add_argument('--lengths', nargs='+', type=int, default=[32, 128])
+    parser.add_argument('--generations', nargs='+', type=int, default=[100])
+    parser.add_argument('--genFraction', type=float, default=0.2, help='The fraction of the population replaced every generation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json', help='The JSON file where the results are stored')
+    parser.add_argument('--compare', default=None, help='A JSON file of a previous run, used as a baseline')
+    options = parser.parse_args(arguments)
+
+    results = []
+    for workload, popSize, length, generations in itertools.product(options.workloads, options.popSizes, options.lengths, options.generations):
+        configuration = { 'workload'    : workload,
+                          'population'  : options.population,
+                          'popSize'     : popSize,
+                          'length'      : length,
+                          'generations' : generations,
+                          'genFraction' : options.genFraction,
+                          'seed'        : options.seed }
+        # A fresh process for every configuration keeps the peak memory measurements independent
+        pool = multiprocessing.Pool(1)
+        result = pool.apply(runConfiguration, (configuration,))
+        pool.close()
+        pool.join()
+        print '%-10s popSize=%-6d length=%-6d generations=%-6d %10.1f gens/s %12.1f evals/s %8.1f MB' % \
+              (workload, popSize, length, generations, result['generationsPerSecond'], result['evaluationsPerSecond'], \
+               (result['peakMemory'] or 0) / float(1<<20))
+        results.append(result)
+
+    report = { 'environment' : { 'python'   : platform.python_version(),
+                                 'numpy'    : np.__version__,
+                                 'platform' : platform.platform(),
+                                 'machine'  : platform.machine(),
+                                 'cpus'     : multiprocessing.cpu_count(),
+                                 'date'     : time.strftime('%Y-%m-%d %H:%M:%S') },
+               'results'     : results }
+    with open(options.output, 'w') as outputFile:
+        json.dump(report, outputFile, indent=2)
+    if options.compare:
+        with open(options.compare) as baselineFile:
+            compare(results, json.load(baselineFile))
+
+## This code runs only when this script is executed as main
+if __name__=='__main__':
+    main(sys.argv[1:])
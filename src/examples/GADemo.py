@@ -1,4 +1,5 @@
 from GeneticAlgorithm import *
+import numpy
 
 ## @class NumOnes
 #  @brief An evaluation operator that computes the number of ones in a segment whose data can be converted to binary using the bin() function
@@ -11,6 +12,17 @@ class NumOnes(EvaluationOperators.BaseEvaluationOperator):
     def evaluateIndividual(self, individual):
         onesPerSegment = (self.segmentOnes(segment) for segment in individual.genotype.segments)
         individual.fitness = reduce( lambda x,y:x+y, onesPerSegment )
+    ## @fn evaluateBatch(self, population, lethals)
+    #  @brief Count the ones of every lethal at once, as the popcount of its packed genotype bits
+    #
+    #  The rows of a GenotypeLibrary.BinaryPopulation are already packed, other populations are packed with GenotypeLibrary.packSegmentData, which handles segments wider than 64 bits
+    def evaluateBatch(self, population, lethals):
+        genes = getattr(population, 'genes', None)
+        if genes is not None:
+            genes = genes[numpy.asarray(lethals, dtype=numpy.intp)]
+        else:
+            genes = GenotypeLibrary.packSegmentData(population.segmentData(lethals), [segment.nBits for segment in population.schema.segments])
+        return numpy.unpackbits(genes, axis=1).sum(axis=1)
 
 ## This code runs only when this script is executed as main
 if __name__=='__main__':
@@ -1,113 +1,163 @@
 from GeneticAlgorithm.Core import GABaseObject as BaseObject
+import sys
+import heapq
+import bisect
 import random
+import itertools
 
 class SearchNode(BaseObject):
-    # Create a new node, and compute its cost
-    def __init__(self, solution=[], objectCosts=[], objectVolumes=[]):
-        self.solution = solution
-        if solution != []:
-            self.cost = self.solutionCost(objectCosts)
-            self.volume = self.solutionVolume(objectVolumes)
-        else:
-            self.cost = 0
-            self.volume = 0
-    
-    # Return adjacent solutions
-    def neighbors(self, objectCosts, objectVolumes, maxVolume):
-        if len(self.solution) == len(objectVolumes):
-            return []
-        else:
-            neighbors = [SearchNode( solution=self.solution + [b], objectCosts=objectCosts, objectVolumes=objectVolumes )\
-                         for b in range(2)]
-            return [n for n in neighbors if not n.exceedsVolume(maxVolume)]
-    
+    # Create a new node. The decisions of the first depth objects (in branching order) are kept as a chain of parent nodes
+    def __init__(self, parent=None, taken=0, depth=0, cost=0, volume=0, bound=0):
+        self.parent = parent
+        self.taken = taken
+        self.depth = depth
+        self.cost = cost
+        self.volume = volume
+        self.bound = bound
+
+    # Create the child node that takes (taken=1) or leaves (taken=0) the next object, updating cost and volume from this node
+    def child(self, taken, objectCost, objectVolume):
+        return SearchNode(parent=self, taken=taken, depth=self.depth+1, \
+                          cost=self.cost + taken*objectCost, volume=self.volume + taken*objectVolume)
+
     # Returns true if the current node exceeds the maximum volume
     def exceedsVolume(self, maxVolume):
         return (self.volume > maxVolume)
-    
-    # Returns the current node solution cost
-    def solutionCost(self, objectCosts):
-        return reduce(lambda x,y:x+y, [self.solution[i]*objectCosts[i] for i in range(len(self.solution))])
 
-    def solutionVolume(self, objectVolumes):
-        return reduce(lambda x,y:x+y, [self.solution[i]*objectVolumes[i] for i in range(len(self.solution))])
+    # Return the decisions of this node, in branching order
+    def decisions(self):
+        decisions = []
+        node = self
+        while node.parent is not None:
+            decisions.append(node.taken)
+            node = node.parent
+        return decisions[::-1]
 
-    # Determines if two nodes are equal
-    def __eq__(self, other):
-        return self.solution == other.solution
+    # The parent chain is not printed
+    def __repr__(self):
+        return 'SearchNode(depth = %d, cost = %r, volume = %r, bound = %r)' % (self.depth, self.cost, self.volume, self.bound)
 
 class SearchManager(BaseObject):
     # Create a new search
-    def __init__(self, objectVolumes, maxVolume, objectCosts):
+    def __init__(self, objectVolumes, maxVolume, objectCosts, verbose=False):
         # Store the parameters
         self.objectVolumes = objectVolumes
         self.objectCosts = objectCosts
         self.maxVolume = maxVolume
-        
-        self.nExpansions = 0;
-        
-        initialNode = SearchNode(solution=[], objectCosts=self.objectCosts, objectVolumes=self.objectVolumes)
-        self.openNodes = [initialNode]
-        self.closedNodes = []
+        self.verbose = verbose
+
+        self.nExpansions = 0
+        self.nPruned = 0
+
+        # Objects are branched on by decreasing cost/volume ratio, so that the fractional relaxation of every node
+        #  takes a prefix of the remaining objects. The prefix sums allow computing it with a binary search
+        self.order = sorted(range(len(objectVolumes)), key=lambda i: -self.ratio(i))
+        self.sortedCosts = [objectCosts[i] for i in self.order]
+        self.sortedVolumes = [objectVolumes[i] for i in self.order]
+        self.cumulativeVolumes = self.prefixSums(self.sortedVolumes)
+        self.cumulativeCosts = self.prefixSums(self.sortedCosts)
+
+        initialNode = SearchNode()
+        initialNode.bound = self.upperBound(initialNode)
+        # The open list is a heap ordered by decreasing upper bound, ties are broken by insertion order
+        self.counter = itertools.count()
+        self.openNodes = [(-initialNode.bound, next(self.counter), initialNode)]
+        # The visited set maps (depth, volume) to the best cost found for that state. A node that reaches an already visited state
+        #  with a cost that is not greater has the same completions as the visited node, and is discarded
+        self.visited = {(0, 0): 0}
         self.bestFound = initialNode
-    
+
+    # Return the cost/volume ratio of an object
+    def ratio(self, i):
+        if self.objectVolumes[i] == 0:
+            return float('inf')
+        return float(self.objectCosts[i]) / self.objectVolumes[i]
+
+    # Return the list of prefix sums of values, starting with 0
+    @staticmethod
+    def prefixSums(values):
+        sums = [0]
+        for v in values:
+            sums.append(sums[-1] + v)
+        return sums
+
+    # Return the cost of the fractional relaxation of a node: the remaining objects are taken in ratio order until the
+    #  knapsack is full, and the first one that does not fit is taken partially
+    def upperBound(self, node):
+        residualVolume = self.maxVolume - node.volume
+        start = self.cumulativeVolumes[node.depth]
+        # k is the number of objects that fit, counted from the first object
+        k = bisect.bisect_right(self.cumulativeVolumes, start + residualVolume, node.depth) - 1
+        bound = node.cost + self.cumulativeCosts[k] - self.cumulativeCosts[node.depth]
+        if k < len(self.order):
+            bound += (residualVolume - (self.cumulativeVolumes[k] - start)) * float(self.sortedCosts[k]) / self.sortedVolumes[k]
+        return bound
+
+    # Return the solution of a node as a binary vector in the original object order
+    def solution(self, node):
+        solution = [0] * len(self.order)
+        for i, taken in zip(self.order, node.decisions()):
+            solution[i] = taken
+        return solution
+
     # Expand one node
     def expand(self):
-        # Choose the node with the highest cost
-        i, node = max( enumerate(self.openNodes), key=lambda t: t[1].cost )
-        # Remove the node from the list of open nodes and append it to the list of closed nodes
-        self.closedNodes.append( self.openNodes.pop(i) )
-        print 'Expanding ', str(node)
+        # Choose the node with the highest upper bound
+        negativeBound, count, node = heapq.heappop(self.openNodes)
+        # The bound may have been overtaken by a solution found after the node was opened
+        if node.bound <= self.bestFound.cost or node.depth == len(self.order):
+            self.nPruned += 1
+            return
+        if self.verbose:
+            print 'Expanding ', str(node)
         self.nExpansions += 1
-        # Get the node's neighbors
-        neighbors = node.neighbors(objectCosts=self.objectCosts, objectVolumes=self.objectVolumes, maxVolume=self.maxVolume)
-        # Examine every neighbor
-        for n in neighbors:
-            # If the neighbor is either the open or closed node lists
-            #  or the cumulative cost is already greater than the best found and the cost is smaller at the same time
-            #  discard the neighbor, otherwise, append it to the list of the open nodes
-            if (n not in self.openNodes) and\
-               (n not in self.closedNodes) and\
-               not (n.volume >= self.bestFound.volume and n.cost < self.bestFound.cost):
-                # Append the node to the list of open nodes
-                self.openNodes.append(n)
-                # If the node has a better cost than the 
-                if n.cost > self.bestFound.cost:
-                    self.bestFound = n
+        objectCost, objectVolume = self.sortedCosts[node.depth], self.sortedVolumes[node.depth]
+        for taken in (1, 0):
+            n = node.child(taken, objectCost, objectVolume)
+            if n.exceedsVolume(self.maxVolume):
+                continue
+            key = (n.depth, n.volume)
+            if self.visited.get(key, -1) >= n.cost:
+                continue
+            self.visited[key] = n.cost
+            # If the node has a better cost than the best found, it becomes the best found
+            if n.cost > self.bestFound.cost:
+                self.bestFound = n
+                if self.verbose:
                     print 'New best found:', str(n)
+            n.bound = self.upperBound(n)
+            # Discard the node if none of its completions can improve the best found
+            if n.bound > self.bestFound.cost:
+                heapq.heappush(self.openNodes, (-n.bound, next(self.counter), n))
             else:
-                'Discarding ', str(n)
-    
-    # Expand all nodes in the open list until it's exhausted
+                self.nPruned += 1
+
+    # Expand nodes until the open list is exhausted, or the best upper bound can not improve the best found
     def run(self):
-        while len(self.openNodes) > 0:
+        while len(self.openNodes) > 0 and -self.openNodes[0][0] > self.bestFound.cost:
             self.expand()
         print 'Best found', self.bestFound
         return self.bestFound
-                    
-                    
-        
+
 if __name__ == '__main__':
-    
-    
+
+
     random.seed(0)
 
     # Kanpsack instance parameters
-    nObjects =  12
-    
+    nObjects = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+
     objectVolumes = [random.randrange(1, 20) for i in xrange(nObjects)]
     objectCosts = [random.randrange(10, 20) for i in xrange(nObjects)]
     maxVolume = reduce(lambda x, y: x+y, objectVolumes) / 2
     volumeLambda = maxVolume*10;
-    
-    search = SearchManager(objectVolumes, maxVolume, objectCosts)
-    search.run()
+
+    search = SearchManager(objectVolumes, maxVolume, objectCosts, verbose=nObjects <= 12)
+    best = search.run()
     print 'Number of expansions', search.nExpansions
+    print 'Number of pruned nodes', search.nPruned
+    print 'Solution', search.solution(best)
     print 'Object Volumes', objectVolumes
     print 'Object Costs', objectCosts
     print 'Max Volume', maxVolume
     print 'Volume Lambda', volumeLambda
-            
-    
-    
-    
\ No newline at end of file
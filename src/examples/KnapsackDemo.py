@@ -58,60 +58,11 @@ from GeneticAlgorithm import *
 #        individual.fitness = solutionCost + lambdaPenalty
 #  @endcode
 
- 
-## @class Knapsack
-#  @brief An evaluation operator that computes the relaxed version of the objective function used to solve a knapsack instance.
-#
-#  This class implements the following evaluation function:
-#   \f{eqnarray*}{
-#        \max \limits_{\textbf{s}} z =& \textbf{c}^{\textrm{T}}\textbf{s} + f_{\lambda}(\textbf{v}, \textbf{s}) \\
-#        f_{\lambda}(\textbf{v}, \textbf{s}) =&
-#               \left\{
-#                 \begin{array}{rl}
-#                   \lambda (V_{\textrm{max}} - \textbf{c}^{\textrm{T}}\textbf{s}) & \textrm{ if }  \textbf{v}^{\textrm{T}}\textbf{s} \leq V_{\textrm{max}}\\
-#                   0 &  \textrm{otherwise}
-#                 \end{array}
-#               \right. \\
-#   \f}
-#
-#  The parameter \f$ \textbf{c} \f$ is the cost vector. Element \f$ c_{i} \f$ is the gain from taking object \f$i\f$.
-#  The parameter \f$ \textbf{v} \f$ is the volume vector. Element \f$ v_{i} \f$ is the volume consumed when taking object \f$i\f$.
-#  The parameter \f$ \textbf{s} \f$ is the solution. Each decision variable \f$ s_{i}\f$ is binary, and takes the value 1 if the object \f$i\f$ is selected to be part of the solution and 0 otherwise.
-#  The parameter \f$ V_{\textrm{max}} \f$ is the maximum volume allowed for a solution. Every valid solution must comply with the restriction \f$ V_{\textrm{max}} \leq \textbf{c}^{\textrm{T}}\textbf{s} \f$. The parameter \f$ \lambda \f$ is a penalization factor, used to penalize all the unfeasible individuals.
-class Knapsack(EvaluationOperators.BaseEvaluationOperator):
-    ## @fn __init__(self, maxVolume=0, objectVolumes=[], volumeLambda=0.0, objectCosts=[], **kwargs)
-    #  @brief Initialize an evaluation operator to implement the evaluation function as described above
-    #  @param maxVolume The maximum volume allowed for feasible solutions \f$ V_{\textrm{max}} \f$
-    #  @param objectVolumes The vector of object volumes \f$ \textbf{v} \f$
-    #  @param objectCosts The vector of object costs \f$ \textbf{c} \f$
-    #  @param volumeLambda The penalization factor \f$ \lambda \f$
-    def __init__(self, maxVolume=0, objectVolumes=[], volumeLambda=0.0, objectCosts=[], **kwargs):
-        super(Knapsack, self).__init__(**kwargs)
-        ## @member maxVolume The maximum volume allowed for feasible solutions \f$ V_{\textrm{max}} \f$
-        self.maxVolume = maxVolume
-        ## @member objectVolumes The vector of object volumes \f$ \textbf{v} \f$
-        self.objectVolumes = objectVolumes
-        ## @member objectCosts The vector of object costs \f$ \textbf{c} \f$
-        self.objectCosts = objectCosts
-        ## @member volumeLambda The penalization factor \f$ \lambda \f$
-        self.volumeLambda = volumeLambda
-
-    ## @fn evaluateIndividual(self, individual)
-    #  @brief Evaluate an individual according to the function described above
-    #  @param individual The list [segment.data for segment in individual.genotype.segments] contains the solution vector \f$ \textbf{s} \f$
-    def evaluateIndividual(self, individual):
-        # Get the vector s
-        segmentsValues = [segment.data for segment in individual.genotype.segments]
-        # Compute the volume used by the solution
-        usedVolume = reduce(lambda x, y: x+y, map(lambda v, s:v*s, self.objectVolumes, segmentsValues))
-        # Compute the solution cost
-        solutionCost = reduce(lambda x, y: x+y, map(lambda v, s:v*s, self.objectCosts, segmentsValues))
-        # The difference between the maximum allowed volume and the solution volume is the residual volume
-        residualVolume = self.maxVolume - usedVolume
-        # If the residual volume is less than 0, the solution is not penalized. The solution is penalized with a cost of lambda*residualVolume otherwise
-        lambdaPenalty = 0 if residualVolume > 0 else self.volumeLambda*residualVolume
-        # The individual fitness is the penalty plus the objective
-        individual.fitness = solutionCost + lambdaPenalty
+## @page KnapsackPage Solving the Knapsack problem
+#  @subsection KnapsackBatch The library operator
+#  The Knapsack class shown above evaluates one individual at a time. The GeneticAlgorithm framework ships a vectorized version of it, KnapsackLibrary.Knapsack, with the same constructor and objective function.
+#  It overloads evaluateBatch instead, so the costs and volumes of every recently replaced individual are computed as two matrix-vector products over the bit matrix of their solutions. It also keeps the cost and volume of every evaluated individual, which lets its flip method move objects in or out of a solution updating only their contributions. The KnapsackLibrary.KnapsackMutate operator replaces Core.Mutate and mutates through flip, so mutated copies of evaluated individuals are not evaluated again.
+#  The script below uses the library operators.
 
 ## @page KnapsackPage Solving the Knapsack problem
 #  @section KnapsackGA Running a GeneticAlgorithm using the Knapsack EvaluationOperator
@@ -169,21 +120,22 @@ if __name__=='__main__':
 #
 #  The Scheduler object contains a population object, as well as a list of genetic operators that are applied iteratively to the population. Here we instantiate some useful operators:
 #  @code
+#    knapsack = KnapsackLibrary.Knapsack(maxVolume, objectVolumes, volumeLambda, objectCosts)
 #    ga = Core.Scheduler(name='Demo',\
 #                        population=p,\
-#                        operators=[Knapsack(maxVolume, objectVolumes, volumeLambda, objectCosts),\
+#                        operators=[knapsack,\
 #                                   LoggingOperators.LogGenerations(iterationFrequency=1),\
 #                                   PlottingOperators.PlotBestLogger(iterationFrequency=1, maximize=maximize),\
 #                                   SelectionOperators.KTournament(),\
 #                                   SelectionOperators.SelectLethals(),\
 #                                   Core.Crossover(),\
-#                                   Core.Mutate()])  
+#                                   KnapsackLibrary.KnapsackMutate(knapsack=knapsack)])  
 #  @endcode
 #
 #  The evaluartion operator is the first one, because individuals need to be evaluated before logging, selection, crossover or mutation can occur. The first GeneticOperator object in the list is an instance of our Knapsack class; Note that every variable that characterizes an instance is passed to the initialization function of the object, so that it can reference them whenever it is required.
 #  The logging operators come next. The LogGenerations operator simply stores a copy of a population and all its individuals every time that an iterationFrequency iterations have elapsed. This example stores every generation of the run.
 #  The PlotBestLogger operator is instantiated next. This operator can be instantiated multiple times, and used to keep track of several properties of an individual. This is the reason why the maximization flag has to be passed to this operator. This class samples the fitness member by default every time that an iterationFrequency iterations have elapsed.
-#  The traditional genetic operators are instantiated next. The KTournament operator implements a 2-tournament selection scheme by default; It sets the matingPool member of the population object to contain a list of indices, which identify the parent individuals used to produce the iteration offspring. The SelectLethals operator selects the worse genSize individuals and marks them for removal with every iteration. The crossover operator generates new individuals by combining the genotypes of the parents in the mating pool, using a one-point crossover algorithm. Finally, the mutation operator may select a random bit from the new offspring and flip its value, to introduce variability to the population.
+#  The traditional genetic operators are instantiated next. The KTournament operator implements a 2-tournament selection scheme by default; It sets the matingPool member of the population object to contain a list of indices, which identify the parent individuals used to produce the iteration offspring. The SelectLethals operator selects the worse genSize individuals and marks them for removal with every iteration. The crossover operator generates new individuals by combining the genotypes of the parents in the mating pool, using a one-point crossover algorithm. Finally, the mutation operator may select a random bit from the new offspring and flip its value, to introduce variability to the population. The KnapsackMutate operator receives the evaluation operator, so that it can update the fitness of the mutated individuals through Knapsack.flip.
 #
 #  @code
 #    ga.runGA(nGenerations)
@@ -211,15 +163,16 @@ if __name__=='__main__':
     ch = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=1) for i in range(nObjects)])
     print ch
     p  = Core.Population(schema=ch, popSize=popSize, genSize=genSize, maximize=maximize, mutation_probability=0.01)
+    knapsack = KnapsackLibrary.Knapsack(maxVolume, objectVolumes, volumeLambda, objectCosts)
     ga = Core.Scheduler(name='Demo',\
                         population=p,\
-                        operators=[Knapsack(maxVolume, objectVolumes, volumeLambda, objectCosts),\
+                        operators=[knapsack,\
                                    LoggingOperators.LogGenerations(iterationFrequency=1),\
                                    PlottingOperators.PlotBestLogger(iterationFrequency=1, maximize=maximize),\
                                    SelectionOperators.KTournament(),\
                                    SelectionOperators.SelectLethals(),\
                                    Core.Crossover(),\
-                                   Core.Mutate()])    
+                                   KnapsackLibrary.KnapsackMutate(knapsack=knapsack)])    
     ga.runGA(nGenerations)
     
     print 'Object Volumes', objectVolumes
@@ -12,8 +12,8 @@ X, Y = np.meshgrid(x, x)
 
 fuzzifier = NDFuzzifier(TriangularSet(-math.pi, 0, 2*math.pi), GaussianSet(0.5, 3))
 
-f = np.vectorize(fuzzifier.fuzzify)
-Z = f(X, Y)
+# The memberships are evaluated once per axis and broadcast over the grid, Z has the layout of X and Y
+Z = fuzzifier.fuzzify(x[np.newaxis, :], x[:, np.newaxis])
 
 
 
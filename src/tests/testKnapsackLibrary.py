@@ -0,0 +1,74 @@
+import random
+import unittest
+import numpy as np
+
+from GeneticAlgorithm import Core, GenotypeLibrary, EvaluationOperators, SelectionOperators, KnapsackLibrary
+
+## @class KnapsackMutateTest
+#  @brief Check that the fitness updated by KnapsackMutate through Knapsack.flip matches a full evaluation of the mutated individuals
+class KnapsackMutateTest(unittest.TestCase):
+    nObjects = 40
+
+    def setUp(self):
+        random.seed(0)
+        np.random.seed(0)
+        self.objectVolumes = [random.randrange(1, 20) for i in xrange(self.nObjects)]
+        self.objectCosts = [random.randrange(10, 20) for i in xrange(self.nObjects)]
+        self.maxVolume = sum(self.objectVolumes) / 2
+        self.schema = Core.Genotype(segments=[GenotypeLibrary.BinaryChromosomeSegment(nBits=1) for i in xrange(self.nObjects)])
+
+    def knapsack(self):
+        return KnapsackLibrary.Knapsack(self.maxVolume, self.objectVolumes, self.maxVolume*10, self.objectCosts)
+
+    ## @fn fullFitness(self, population)
+    #  @brief Evaluate every individual from its segment data, ignoring any stored totals
+    def fullFitness(self, population):
+        solutions = np.array(population.segmentData(), dtype=np.int64).reshape(len(population.individuals), -1)
+        cost, volume = solutions.dot(self.objectCosts), solutions.dot(self.objectVolumes)
+        return np.where(volume < self.maxVolume, cost, cost + self.maxVolume*10*(self.maxVolume - volume))
+
+    def runGA(self, population, evaluation, knapsack, nGenerations):
+        ga = Core.Scheduler(population=population,\
+                            operators=[evaluation,\
+                                       SelectionOperators.KTournament(),\
+                                       SelectionOperators.SelectLethals(),\
+                                       Core.Crossover(),\
+                                       KnapsackLibrary.KnapsackMutate(knapsack=knapsack)])
+        ga.initialize()
+        for i in xrange(nGenerations):
+            ga.iterate()
+        return ga
+
+    def checkMutation(self, Population, evaluation=None):
+        knapsack = self.knapsack()
+        p = Population(schema=self.schema, popSize=60, genSize=30, maximize=True, mutation_probability=1.0, crossover_probability=0.5)
+        self.runGA(p, evaluation or knapsack, knapsack, 5)
+        # The last iteration mutated the lethals after the evaluation, the individuals updated by flip must have the exact fitness
+        flipped = [i for i in p.lethals if knapsack.hasTotals(p, i)]
+        self.assertTrue(flipped)
+        np.testing.assert_array_equal(np.asarray(p.getFitness(flipped)), self.fullFitness(p)[flipped])
+        # A new evaluation trusts only current totals, and must match a full evaluation of every individual
+        (evaluation or knapsack).evaluate(p)
+        np.testing.assert_array_equal(np.asarray(p.getFitness(), dtype=np.float64), self.fullFitness(p))
+
+    def testPopulation(self):
+        self.checkMutation(Core.Population)
+
+    def testBinaryPopulation(self):
+        self.checkMutation(GenotypeLibrary.BinaryPopulation)
+
+    def testCachedEvaluation(self):
+        # Cache hits do not refresh the totals, which must not be trusted by flip afterwards
+        knapsack = self.knapsack()
+        self.checkMutation(Core.Population, EvaluationOperators.CachedEvaluation(operator=knapsack))
+
+    def testFlipWithoutTotals(self):
+        knapsack = self.knapsack()
+        p = Core.Population(schema=self.schema, popSize=4)
+        self.assertRaises(ValueError, knapsack.flip, p, 0, [1])
+        knapsack.evaluate(p)
+        p.individuals[1] = p.individuals[0].clone(genotype=p.individuals[2].genotype.clone())
+        self.assertRaises(ValueError, knapsack.flip, p, 1, [1])
+
+if __name__ == '__main__':
+    unittest.main()